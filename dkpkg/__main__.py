@@ -0,0 +1,8 @@
+"""
+Run the ``dkpkg`` command line interface: ``python -m dkpkg``.
+"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
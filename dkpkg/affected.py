@@ -0,0 +1,97 @@
+"""
+Map changed files to the packages, layout roles and build steps they affect.
+
+::
+
+    idx = PrefixIndex(packages)
+    for root, roles in idx.affected(changed_paths).items():
+        print(root, roles, steps_for(roles))
+
+Each path is resolved by walking up its parent directories and looking
+them up in a dict of all role directories, so the cost is linear in the
+number of changed paths (times their depth), independent of the number of
+packages.
+"""
+import os
+
+#: The build steps that must be re-run when a file in a role changes.
+#: Files in the package root outside any role (e.g. ``setup.py``) map to
+#: the ``package`` role.
+ROLE_STEPS = {
+    'package': {'build_pytest', 'build_coverage', 'build_lintscore', 'build_docs', 'build_meta'},
+    'source': {'build_pytest', 'build_coverage', 'build_lintscore', 'build_docs'},
+    'source_js': {'js'},
+    'source_less': {'css'},
+    'source_styles': {'css'},
+    'django_static': {'collectstatic'},
+    'django_templates': {'build_pytest'},
+    'docs': {'build_docs'},
+    'tests': {'build_pytest', 'build_coverage'},
+    'tests_js': {'js_tests'},
+}
+
+#: Roles indexed, in addition to the package root.
+INDEXED_ROLES = ['source', 'source_js', 'source_less', 'source_styles',
+                 'django_static', 'django_templates', 'docs', 'tests',
+                 'tests_js', 'build']
+
+
+def steps_for(roles):
+    """The union of build steps for ``roles``.
+    """
+    steps = set()
+    for role in roles:
+        steps |= ROLE_STEPS.get(role, set())
+    return steps
+
+
+class PrefixIndex:
+    """Index from directory path to ``(package root, role)`` over all
+       packages.
+    """
+
+    def __init__(self, packages):
+        self.index = {}
+        for pkg in packages:
+            self.index[os.path.normpath(pkg.root)] = (pkg.root, 'package')
+            for role in INDEXED_ROLES:
+                path = getattr(pkg, role, None)
+                if path is not None:
+                    self.index[os.path.normpath(path)] = (pkg.root, role)
+
+    def lookup(self, path):
+        """Return ``(package root, role)`` for the most specific role
+           containing ``path``, or ``None``.
+        """
+        path = os.path.normpath(os.path.abspath(path))
+        while True:
+            hit = self.index.get(path)
+            if hit is not None:
+                return hit
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+    def affected(self, paths, base=None):
+        """Map each package root touched by ``paths`` to the set of roles
+           touched.  Relative paths are resolved against ``base`` (default:
+           the current directory).  Changes to ``build`` are ignored.
+        """
+        result = {}
+        for path in paths:
+            if base is not None:
+                path = os.path.join(base, path)
+            hit = self.lookup(path)
+            if hit is None or hit[1] == 'build':
+                continue
+            result.setdefault(hit[0], set()).add(hit[1])
+        return result
+
+
+def affected_steps(packages, paths, base=None):
+    """Map each affected package root to the build steps to re-run.
+    """
+    idx = PrefixIndex(packages)
+    return {root: steps_for(roles)
+            for root, roles in idx.affected(paths, base).items()}
@@ -0,0 +1,219 @@
+"""
+Stream the contents of layout roles to a tar archive, and restore them.
+
+::
+
+    pkg.archive('build.tar', ['build_pytest', 'build_coverage', 'source_dirs'])
+    other.restore('build.tar')
+
+Members are named ``<role>/<path relative to the role directory>``, so an
+archive can be restored into a package with a different layout.  A
+selected role nested inside another selected role (``build_coverage`` in
+``build``) is stored under its own name, so it is restored into the
+target's ``build_coverage`` wherever that is.  Modification times and
+permission bits are restored too, so mtime-based change detection
+(:mod:`dkpkg.assets`, :mod:`dkpkg.docbuild`) keeps working.  Files
+are streamed into the archive one chunk at a time, and an index
+(``<fname>.index.json``) records where each file's data is stored.  For
+uncompressed archives the index is used to extract single files
+(:func:`extract_file`) and to restore files in parallel; compressed
+archives (``compression='gz'``, or ``'zstd'`` if the optional
+``zstandard`` package is installed) are restored sequentially.
+"""
+import json
+import os
+import shutil
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+
+from .directory import ROLES
+
+try:
+    import zstandard
+except ImportError:  # pragma: nocover
+    zstandard = None
+
+_BLOCK = tarfile.BLOCKSIZE
+
+#: Roles that are not directories of the package.
+_NOT_DIRS = {'root', 'location', 'name', 'package_name'}
+
+
+def index_name(fname):
+    """The name of the index file belonging to the archive ``fname``.
+    """
+    return fname + '.index.json'
+
+
+def _role_dirs(pkg, roles):
+    """``(role, directory)`` for ``roles``.  If two roles have the same
+       directory the first one wins.
+    """
+    dirs = {}
+    for r in pkg.expand_roles(roles):
+        d = getattr(pkg, r)
+        if d is not None:
+            dirs.setdefault(os.path.normpath(d), r)
+    return [(r, d) for d, r in dirs.items()]
+
+
+def _open_write(fname, compression):
+    if compression is None:
+        return None, tarfile.open(fname, 'w')
+    if compression == 'gz':
+        return None, tarfile.open(fname, 'w|gz')
+    if compression == 'zstd':
+        if zstandard is None:  # pragma: nocover
+            raise ImportError('zstd compression requires the zstandard package')
+        raw = open(fname, 'wb')  # pylint: disable=consider-using-with
+        writer = zstandard.ZstdCompressor().stream_writer(raw)
+        return writer, tarfile.open(fileobj=writer, mode='w|')
+    raise ValueError(f'unknown compression: {compression!r}')
+
+
+def archive(pkg, fname, roles, compression=None):
+    """Write the files below the directories of ``roles`` (role names or
+       group names like ``'source_dirs'``) to the tar archive ``fname``.
+
+       Returns the index, which is also written to :func:`index_name`.
+    """
+    index = {'compression': compression, 'roles': {}, 'files': {}}
+    writer, tar = _open_write(fname, compression)
+    role_dirs = _role_dirs(pkg, roles)
+    selected = {d for _, d in role_dirs}
+    try:
+        for role, top in role_dirs:
+            if not os.path.isdir(top):
+                continue
+            index['roles'][role] = os.path.relpath(top, pkg.root)
+            for dirpath, dirnames, filenames in os.walk(top):
+                # nested selected roles are stored under their own name
+                dirnames[:] = sorted(d for d in dirnames
+                                     if os.path.join(dirpath, d) not in selected)
+                for f in sorted(filenames):
+                    path = os.path.join(dirpath, f)
+                    arcname = '/'.join([role] + os.path.relpath(path, top).split(os.sep))
+                    info = tar.gettarinfo(path, arcname)
+                    if not info.isfile():
+                        continue
+                    st = os.stat(path)
+                    with open(path, 'rb') as fp:
+                        tar.addfile(info, fp)
+                    padded = -(-info.size // _BLOCK) * _BLOCK
+                    index['files'][arcname] = [tar.offset - padded, info.size,
+                                               st.st_mtime_ns, st.st_mode & 0o7777]
+    finally:
+        tar.close()
+        if writer is not None:
+            writer.close()
+    with open(index_name(fname), 'w') as fp:
+        json.dump(index, fp)
+    return index
+
+
+def read_index(fname):
+    """Read the index of the archive ``fname``.
+    """
+    with open(index_name(fname)) as fp:
+        return json.load(fp)
+
+
+def _copy_range(fname, offset, size, out):
+    with open(fname, 'rb') as fp:
+        fp.seek(offset)
+        while size > 0:
+            chunk = fp.read(min(size, 1 << 16))
+            if not chunk:
+                raise EOFError(f'{fname} is truncated')
+            out.write(chunk)
+            size -= len(chunk)
+
+
+def extract_file(fname, arcname, out, index=None):
+    """Write the contents of the member ``arcname`` of the uncompressed
+       archive ``fname`` to the file object ``out``, without reading the
+       rest of the archive.
+    """
+    index = index or read_index(fname)
+    if index['compression'] is not None:
+        raise ValueError('single file extraction needs an uncompressed archive')
+    offset, size = index['files'][arcname][:2]
+    _copy_range(fname, offset, size, out)
+
+
+def _destination(pkg, arcname, roles):
+    """The path in ``pkg`` of the member ``arcname``.  The member must
+       belong to one of the archived directory ``roles``, and must stay
+       inside that role's directory.
+    """
+    role, _, rel = arcname.partition('/')
+    if role not in roles or role not in ROLES or role in _NOT_DIRS or not rel:
+        raise ValueError(f'invalid archive member: {arcname}')
+    top = getattr(pkg, role, None)
+    if not isinstance(top, str):
+        raise ValueError(f'invalid archive member: {arcname}')
+    top = os.path.normpath(os.path.abspath(top))
+    dst = os.path.normpath(os.path.join(top, *rel.split('/')))
+    if not dst.startswith(top + os.sep):
+        raise ValueError(f'invalid archive member: {arcname}')
+    return dst
+
+
+def _set_meta(dst, mtime_ns, mode):
+    """Restore the permission bits and modification time of ``dst``.
+    """
+    os.chmod(dst, mode)
+    os.utime(dst, ns=(mtime_ns, mtime_ns))
+
+
+def restore(pkg, fname, workers=None):
+    """Extract the archive ``fname`` into the role directories of ``pkg``,
+       with the modification times and permission bits of the originals.
+
+       Returns the list of files written.
+    """
+    index = read_index(fname)
+    written = []
+
+    if index['compression'] is None:
+        def extract(item):
+            arcname, (offset, size, *meta) = item
+            dst = _destination(pkg, arcname, index['roles'])
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            with open(dst, 'wb') as out:
+                _copy_range(fname, offset, size, out)
+            if meta:
+                _set_meta(dst, *meta)
+            return dst
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            written.extend(pool.map(extract, sorted(index['files'].items())))
+        return written
+
+    if index['compression'] == 'zstd':
+        if zstandard is None:  # pragma: nocover
+            raise ImportError('zstd compression requires the zstandard package')
+        raw = open(fname, 'rb')  # pylint: disable=consider-using-with
+        tar = tarfile.open(fileobj=zstandard.ZstdDecompressor().stream_reader(raw), mode='r|')
+    else:
+        raw = None
+        tar = tarfile.open(fname, 'r|*')
+    try:
+        for info in tar:
+            if not info.isfile():
+                continue
+            dst = _destination(pkg, info.name, index['roles'])
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            with open(dst, 'wb') as out:
+                shutil.copyfileobj(tar.extractfile(info), out)
+            entry = index['files'].get(info.name, [])
+            if len(entry) == 4:
+                _set_meta(dst, *entry[2:])
+            else:
+                _set_meta(dst, int(info.mtime * 1e9), info.mode & 0o7777)
+            written.append(dst)
+    finally:
+        tar.close()
+        if raw is not None:
+            raw.close()
+    return written
@@ -0,0 +1,112 @@
+"""
+Content-hashed manifest of static assets.
+
+::
+
+    manifest = build_manifest(Package('.'))
+    manifest['paths']['css/site.css']      # 'css/site.3f2a9c1b04de.css'
+
+The manifest has the same ``paths`` mapping as Django's
+``ManifestStaticFilesStorage`` (``staticfiles.json``).  Files from
+``django_static`` are keyed by their path relative to that directory;
+files from other roles are prefixed with the role name
+(``source_js/app.js``).  The manifest is written to
+``build_meta/staticfiles.json`` together with the size and modification
+time of each file, so the next run only re-hashes files that changed.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+#: Roles whose files are fingerprinted by default.
+ASSET_ROLES = ('django_static', 'source_js', 'source_less', 'source_styles')
+
+#: Name of the manifest file in ``build_meta``.
+MANIFEST = 'staticfiles.json'
+
+#: Number of hex digits of the hash used in fingerprinted names.
+HASH_LENGTH = 12
+
+
+def manifest_path(pkg):
+    """The path of the manifest file of ``pkg``.
+    """
+    return os.path.join(pkg.build_meta, MANIFEST)
+
+
+def fingerprint(name, digest):
+    """Insert ``digest`` before the extension of ``name``.
+    """
+    base, ext = os.path.splitext(name)
+    return f'{base}.{digest[:HASH_LENGTH]}{ext}'
+
+
+def _hash_file(fname):
+    h = hashlib.md5(usedforsecurity=False)
+    with open(fname, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _assets(pkg, roles):
+    """Yield ``(key, path, stat)`` for all files in ``roles``.
+    """
+    for role in roles:
+        top = getattr(pkg, role, None)
+        if top is None or not os.path.isdir(top):
+            continue
+        prefix = '' if role == 'django_static' else role + '/'
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames.sort()
+            for f in sorted(filenames):
+                path = os.path.join(dirpath, f)
+                rel = os.path.relpath(path, top).replace(os.sep, '/')
+                yield prefix + rel, path, os.stat(path)
+
+
+def load_manifest(pkg):
+    """Return the previously written manifest of ``pkg``, or an empty one.
+    """
+    try:
+        with open(manifest_path(pkg)) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {'version': '1.1', 'paths': {}, 'files': {}}
+
+
+def build_manifest(pkg, roles=ASSET_ROLES, workers=None, write=True):
+    """Compute (and with ``write``, save) the asset manifest of ``pkg``.
+
+       Only files whose size or modification time changed since the last
+       manifest are hashed, in parallel.  Returns the manifest dict.
+    """
+    old = load_manifest(pkg).get('files', {})
+    files = {}
+    todo = []
+    for key, path, st in _assets(pkg, roles):
+        prev = old.get(key)
+        if prev and prev['size'] == st.st_size and prev['mtime'] == st.st_mtime_ns:
+            files[key] = prev
+        else:
+            files[key] = {'size': st.st_size, 'mtime': st.st_mtime_ns}
+            todo.append((key, path))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (key, _), digest in zip(todo, pool.map(lambda t: _hash_file(t[1]), todo)):
+            files[key]['hash'] = digest
+
+    manifest = {
+        'version': '1.1',
+        'paths': {key: fingerprint(key, info['hash']) for key, info in sorted(files.items())},
+        'files': files,
+        'rehashed': sorted(key for key, _ in todo),
+    }
+    if write:
+        os.makedirs(pkg.build_meta, exist_ok=True)
+        tmp = manifest_path(pkg) + '.tmp'
+        with open(tmp, 'w') as fp:
+            json.dump(manifest, fp, indent=1, sort_keys=True)
+        os.replace(tmp, manifest_path(pkg))
+    return manifest
@@ -0,0 +1,106 @@
+"""
+Columnar computation of default layouts for many roots at once.
+
+::
+
+    table = LayoutTable(roots)
+    table['build_docs']          # list of str, one per root
+    table.package(0)             # a full Package for the first root
+
+The columns hold plain strings, built with one list comprehension per
+role, instead of a :class:`dkpkg.directory.Package` (with a
+``dkfileutils.path.Path`` per field) per root.  The values are the
+same as those of ``Package(root)`` with no overrides.
+"""
+import os
+
+from .directory import Package
+
+
+class LayoutTable:
+    """Default package layouts for ``roots``, one column per role.
+    """
+
+    #: Column names, in order.
+    COLUMNS = (
+        'root', 'location', 'package_name', 'name',
+        'docs', 'tests', 'tests_js', 'build', 'source',
+        'source_js', 'source_less', 'source_styles',
+        'django_templates', 'django_static',
+        'django_models_dir', 'django_models_py',
+        'build_coverage', 'build_docs', 'build_lintscore',
+        'build_meta', 'build_pytest',
+        'public_dir', 'app_templates',
+    )
+
+    def __init__(self, roots):
+        sep = os.sep
+        abspath = os.path.abspath
+        split = os.path.split
+
+        root = [abspath(r) for r in roots]
+        parts = [split(r) for r in root]
+        location = [p[0] for p in parts]
+        package_name = [p[1] for p in parts]
+        name = [n.replace('-', '') for n in package_name]
+
+        def sub(col, suffix):
+            suffix = sep + suffix
+            return [c + suffix for c in col]
+
+        source = [r + sep + n for r, n in zip(root, name)]
+        build = sub(root, 'build')
+        django_templates = sub(source, 'templates')
+
+        self.columns = {
+            'root': root,
+            'location': location,
+            'package_name': package_name,
+            'name': name,
+            'docs': sub(root, 'docs'),
+            'tests': sub(root, 'tests'),
+            'tests_js': sub(root, 'tests' + sep + 'js'),
+            'build': build,
+            'source': source,
+            'source_js': sub(root, 'js'),
+            'source_less': sub(root, 'less'),
+            'source_styles': sub(root, 'styles'),
+            'django_templates': django_templates,
+            'django_static': sub(source, 'static'),
+            'django_models_dir': sub(source, 'models'),
+            'django_models_py': sub(source, 'models.py'),
+            'build_coverage': sub(build, 'coverage'),
+            'build_docs': sub(build, 'docs'),
+            'build_lintscore': sub(build, 'lintscore'),
+            'build_meta': sub(build, 'meta'),
+            'build_pytest': sub(build, 'pytest'),
+            'public_dir': sub(root, 'public'),
+            'app_templates': [t + sep + n for t, n in zip(django_templates, name)],
+        }
+
+    def __len__(self):
+        return len(self.columns['root'])
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def row(self, i):
+        """The layout of the ``i``'th root as a dict.
+        """
+        return {col: values[i] for col, values in self.columns.items()}
+
+    def rows(self):
+        """Iterate over all layouts as dicts.
+        """
+        return (dict(zip(self.COLUMNS, values))
+                for values in zip(*(self.columns[c] for c in self.COLUMNS)))
+
+    def package(self, i):
+        """The ``i``'th layout as a :class:`dkpkg.directory.Package`.
+        """
+        return Package(self.columns['root'][i])
+
+    def packages(self):
+        """Iterate over all layouts as :class:`dkpkg.directory.Package`.
+        """
+        return (Package(root) for root in self.columns['root'])
@@ -0,0 +1,169 @@
+"""
+Command line interface.
+
+::
+
+    dkpkg path/to/pkg another/pkg            # one JSON object per line
+    find . -name setup.py -printf '%h\\n' | dkpkg --jobs 8
+    dkpkg --serve /tmp/dkpkg.sock &          # keep one warm process, see dkpkg.daemon
+    dkpkg --connect /tmp/dkpkg.sock pkg      # ask it
+
+Roots are read from the arguments, or from stdin (one per line) when no
+arguments are given or the argument is ``-``.
+"""
+import argparse
+import collections
+import errno
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from .directory import Package
+
+
+def describe(root):
+    """The layout of the package at ``root`` as a JSON-serializable dict.
+    """
+    pkg = Package(root)
+    models = pkg.django_models
+    return {
+        'root': str(pkg.root),
+        'layout': {k: str(v) for k, v in sorted(vars(pkg).items()) if not k.startswith('_')},
+        'missing_dirs': [str(d) for d in pkg.missing_dirs()],
+        'is_django': pkg.is_django(),
+        'django_models': str(models) if models is not None else None,
+    }
+
+
+def _describe_line(root):
+    try:
+        return json.dumps(describe(root))
+    except Exception as e:  # pylint: disable=broad-except
+        return json.dumps({'root': root, 'error': str(e)})
+
+
+def _roots(args, stdin):
+    if not args or args == ['-']:
+        return (line.strip() for line in stdin if line.strip())
+    return iter(args)
+
+
+def run(roots, out, jobs=1):
+    """Write one JSON line per root to ``out``, in input order.
+
+       With ``jobs > 1`` at most ``2 * jobs`` roots are in flight, so
+       answers are written while ``roots`` is still being read.
+    """
+    if jobs <= 1:
+        for root in roots:
+            out.write(_describe_line(root) + '\n')
+        return
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for root in roots:
+            pending.append(pool.submit(_describe_line, root))
+            if len(pending) >= 2 * jobs:
+                out.write(pending.popleft().result() + '\n')
+        while pending:
+            out.write(pending.popleft().result() + '\n')
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            root = line.decode('utf-8').strip()
+            if root:
+                self.wfile.write((self.server.describe_line(root) + '\n').encode('utf-8'))
+                self.wfile.flush()
+
+
+def _remove_stale_socket(path):
+    """Remove ``path`` if it is a socket nobody listens on.  Raises
+       :class:`OSError` if ``path`` is something else, or a live socket.
+    """
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        raise FileExistsError(errno.EEXIST, 'not a socket', path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            os.unlink(path)
+            return
+    raise OSError(errno.EADDRINUSE, 'a server is already listening', path)
+
+
+def make_server(path, describe_line=_describe_line):
+    """A threading Unix socket server answering one JSON line per root.
+       A stale socket left at ``path`` by a dead server is replaced.
+    """
+    _remove_stale_socket(path)
+    server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    server.daemon_threads = True
+    server.describe_line = describe_line
+    return server
+
+
+def _answers(sock, roots):
+    with sock, sock.makefile('rwb') as f:
+        for root in roots:
+            f.write((os.path.abspath(root) + '\n').encode('utf-8'))
+            f.flush()
+            line = f.readline()
+            if not line:
+                raise ConnectionResetError(errno.ECONNRESET, 'server closed the connection', root)
+            yield line.decode('utf-8').rstrip('\n')
+
+
+def query(path, roots):
+    """Send ``roots`` to the server at ``path`` and return an iterator
+       over its answers.  Relative roots are made absolute first, since the
+       server's current directory is not ours.
+
+       Connecting happens immediately, and raises :class:`OSError` if no
+       server is listening.  A server that goes away later raises
+       :class:`OSError` from the iterator.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return _answers(sock, roots)
+
+
+def main(argv=None):
+    """Entry point for the ``dkpkg`` command.
+    """
+    p = argparse.ArgumentParser(prog='dkpkg', description='Print package layouts as JSON lines.')
+    p.add_argument('roots', nargs='*', help='package roots (default: read from stdin)')
+    p.add_argument('-j', '--jobs', type=int, default=1, help='number of parallel workers')
+    p.add_argument('--serve', metavar='SOCKET', help='serve requests on a Unix socket')
+    p.add_argument('--connect', metavar='SOCKET', help='send requests to a running server')
+    args = p.parse_args(argv)
+
+    if args.serve:
+        from .daemon import serve  # pylint: disable=import-outside-toplevel
+        serve(args.serve)
+        return 0
+
+    roots = _roots(args.roots, sys.stdin)
+    if args.connect:
+        try:
+            answers = query(args.connect, roots)
+        except OSError:
+            answers = None  # no server, compute in-process
+        if answers is not None:
+            for line in answers:
+                sys.stdout.write(line + '\n')
+            return 0
+    run(roots, sys.stdout, args.jobs)
+    return 0
@@ -0,0 +1,121 @@
+"""
+Aggregate coverage results across many packages.
+
+::
+
+    report = aggregate([Package(r) for r in roots], workers=8)
+    write_report('build/coverage-summary.json', report)
+
+The Cobertura XML reports (``coverage.xml``) below each package's
+``build_coverage`` are parsed incrementally with
+``xml.etree.ElementTree.iterparse``, so only the per-line results of
+one package are held in memory at a time.  Lines reported by several XML
+files of the same package are merged (a line is covered if any report
+covered it).  Raw ``.coverage`` data files are listed in the summary, but
+not read; use ``coverage combine`` for those.
+"""
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+_condition_re = re.compile(r'\((\d+)/(\d+)\)')
+
+
+def find_coverage_files(pkg):
+    """Return ``(xml_reports, data_files)`` below ``pkg.build_coverage``.
+    """
+    xml, data = [], []
+    top = str(pkg.build_coverage)
+    for dirpath, dirnames, filenames in os.walk(top):
+        dirnames.sort()
+        for f in sorted(filenames):
+            path = os.path.join(dirpath, f)
+            if f.endswith('.xml') and f.startswith('coverage'):
+                xml.append(path)
+            elif f == '.coverage' or f.startswith('.coverage.'):
+                data.append(path)
+    return xml, data
+
+
+def _read_xml(fname, lines):
+    """Merge the line results of the Cobertura report ``fname`` into
+       ``lines``: ``{(filename, lineno): (hits, branches, covered_branches)}``.
+    """
+    filename = None
+    for event, elem in ElementTree.iterparse(fname, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == 'class':
+                filename = elem.get('filename')
+            continue
+        if elem.tag == 'line' and filename is not None:
+            key = (filename, int(elem.get('number')))
+            hits = int(elem.get('hits', 0))
+            branches = covered = 0
+            m = _condition_re.search(elem.get('condition-coverage', ''))
+            if elem.get('branch') == 'true' and m:
+                covered, branches = int(m.group(1)), int(m.group(2))
+            prev = lines.get(key)
+            if prev is not None:
+                hits = max(hits, prev[0])
+                branches = max(branches, prev[1])
+                covered = max(covered, prev[2])
+            lines[key] = (hits, branches, covered)
+        elif elem.tag == 'class':
+            filename = None
+            elem.clear()
+        elif elem.tag == 'package':
+            elem.clear()
+
+
+def summarize(pkg):
+    """Coverage summary of one package.
+    """
+    xml, data = find_coverage_files(pkg)
+    lines = {}
+    for fname in xml:
+        _read_xml(fname, lines)
+    files = {f for f, _ in lines}
+    return {
+        'root': str(pkg.root),
+        'reports': xml,
+        'data_files': data,
+        'files': len(files),
+        'lines_valid': len(lines),
+        'lines_covered': sum(1 for hits, _, _ in lines.values() if hits),
+        'branches_valid': sum(b for _, b, _ in lines.values()),
+        'branches_covered': sum(c for _, _, c in lines.values()),
+    }
+
+
+def _rate(covered, valid):
+    return round(covered / valid, 4) if valid else None
+
+
+def aggregate(packages, workers=None):
+    """Summarize the coverage of ``packages`` in parallel.
+
+       Returns ``{'packages': {package_name: summary}, 'total': summary}``.
+    """
+    packages = list(packages)
+    keys = ('files', 'lines_valid', 'lines_covered', 'branches_valid', 'branches_covered')
+    total = dict.fromkeys(keys, 0)
+    result = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for pkg, summary in zip(packages, pool.map(summarize, packages)):
+            summary['line_rate'] = _rate(summary['lines_covered'], summary['lines_valid'])
+            summary['branch_rate'] = _rate(summary['branches_covered'], summary['branches_valid'])
+            result[pkg.package_name] = summary
+            for k in keys:
+                total[k] += summary[k]
+    total['line_rate'] = _rate(total['lines_covered'], total['lines_valid'])
+    total['branch_rate'] = _rate(total['branches_covered'], total['branches_valid'])
+    return {'packages': result, 'total': total}
+
+
+def write_report(fname, report):
+    """Write the output of :func:`aggregate` to ``fname`` as JSON.
+    """
+    with open(fname, 'w') as fp:
+        json.dump(report, fp, indent=2, sort_keys=True)
@@ -0,0 +1,316 @@
+"""
+Long-lived layout server with warm caches.
+
+Start the server with ``dkpkg --serve /tmp/dkpkg.sock`` (or
+:func:`serve`), and query it with :func:`connect`, which falls back to an
+ordinary in-process :class:`dkpkg.directory.Package` when no server is
+running::
+
+    pkg = connect('path/to/pkg', '/tmp/dkpkg.sock')
+    pkg.is_django(), pkg.missing_dirs(), pkg.build_docs
+
+The server caches the answers for each root.  On Linux the directories
+that were probed are watched with inotify, and a root's answers are
+dropped as soon as one of them changes; elsewhere the cached answer is
+re-validated against the modification times of those directories.
+
+The protocol is one request per line, ``<command>\\t<root>`` (or just
+``<root>`` for ``describe``), answered by one line of JSON.
+"""
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+
+from dkfileutils.path import Path
+
+from .cli import describe, make_server
+from .directory import NAME_ROLES, ROLES, Package
+
+#: Commands understood by the server, and the keys of their answers.
+COMMANDS = {
+    'describe': None,
+    'layout': 'layout',
+    'is_django': 'is_django',
+    'missing_dirs': 'missing_dirs',
+    'django_models': 'django_models',
+}
+
+_IN_ATTRIB = 0x004
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_IGNORED = 0x8000
+_WATCH_MASK = (_IN_ATTRIB | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE
+               | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_EVENT = struct.Struct('iIII')
+
+
+def _watched_dirs(root):
+    """The directories whose entries determine the answers for ``root``
+       (computed from the layout alone, without touching the disk).
+    """
+    pkg = Package(root)
+    paths = [getattr(pkg, r) for r in ROLES if r not in ('name', 'package_name', 'location')]
+    return sorted({os.path.dirname(os.path.normpath(p)) for p in paths})
+
+
+class Inotify:
+    """Minimal inotify binding (Linux only), calling ``callback(key)``
+       when a directory watched for ``key`` changes.
+    """
+
+    def __init__(self, callback):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.callback = callback
+        self.keys = {}
+        self._lock = threading.Lock()
+        # closing self.fd does not wake a thread blocked reading it, so
+        # close() wakes the reader through this pipe instead.
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def watch(self, path, key):
+        """Watch the directory ``path`` on behalf of ``key``.  Returns
+           False if ``path`` cannot be watched (e.g. it does not exist).
+        """
+        with self._lock:
+            if self.fd < 0:
+                return False
+            wd = self._add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                return False
+            self.keys.setdefault(wd, set()).add(key)
+        return True
+
+    def unwatch(self, key):
+        """Stop watching the directories that are only watched for ``key``.
+        """
+        with self._lock:
+            unused = []
+            for wd, keys in self.keys.items():
+                keys.discard(key)
+                if not keys:
+                    unused.append(wd)
+            for wd in unused:
+                del self.keys[wd]
+                if self.fd >= 0:
+                    self._rm_watch(self.fd, wd)
+
+    def close(self):
+        """Stop the reader thread, and close the inotify descriptor (which
+           removes all watches).
+        """
+        with self._lock:
+            if self.fd < 0:
+                return
+            fd, self.fd = self.fd, -1
+            self.keys.clear()
+        os.write(self._wake_w, b'x')
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+        os.close(fd)
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+    def _read(self):
+        fd = self.fd
+        while True:
+            try:
+                ready, _, _ = select.select([fd, self._wake_r], [], [])
+                if self._wake_r in ready:
+                    return
+                buf = os.read(fd, 64 * 1024)
+            except OSError:
+                return
+            pos = 0
+            while pos < len(buf):
+                wd, mask, _, length = _EVENT.unpack_from(buf, pos)
+                pos += _EVENT.size + length
+                with self._lock:
+                    keys = self.keys.pop(wd, set()) if mask & _IN_IGNORED else self.keys.get(wd, set())
+                    keys = list(keys)
+                for key in keys:
+                    self.callback(key)
+
+
+class LayoutCache:
+    """Cached :func:`dkpkg.cli.describe` answers per root.
+    """
+
+    def __init__(self, use_inotify=None):
+        self._lock = threading.Lock()
+        self._answers = {}
+        self._generation = {}
+        self.inotify = None
+        if use_inotify or (use_inotify is None and sys.platform.startswith('linux')):
+            try:
+                self.inotify = Inotify(self.invalidate)
+            except (OSError, AttributeError):  # pragma: nocover
+                self.inotify = None
+
+    def invalidate(self, root):
+        """Forget the cached answer for ``root``.
+        """
+        with self._lock:
+            self._answers.pop(root, None)
+            self._generation[root] = self._generation.get(root, 0) + 1
+        if self.inotify is not None:
+            # get() watches the directories again when root is next asked for
+            self.inotify.unwatch(root)
+
+    def close(self):
+        """Stop watching directories.  Answers are still served, but are
+           re-validated against modification times from now on.
+        """
+        inotify, self.inotify = self.inotify, None
+        if inotify is not None:
+            inotify.close()
+            with self._lock:
+                # nothing would tell us these have changed any more
+                self._answers = {root: cached for root, cached in self._answers.items()
+                                 if cached[2] is not None}
+
+    def _signature(self, dirs):
+        sig = []
+        for d in dirs:
+            try:
+                sig.append(os.stat(d).st_mtime_ns)
+            except OSError:
+                sig.append(None)
+        return sig
+
+    def get(self, root):
+        """The (possibly cached) description of the package at ``root``.
+        """
+        root = os.path.abspath(root)
+        with self._lock:
+            cached = self._answers.get(root)
+            generation = self._generation.get(root, 0)
+        if cached is not None:
+            answer, dirs, sig = cached
+            if sig is None or self._signature(dirs) == sig:
+                return answer
+
+        # start watching (or take the signature) before probing the disk,
+        # so that changes made while describe() runs are not lost.  If a
+        # directory can't be watched, fall back to comparing mtimes.
+        dirs = _watched_dirs(root)
+        sig = None
+        if self.inotify is None or not all([self.inotify.watch(d, root) for d in dirs]):
+            sig = self._signature(dirs)
+        answer = describe(root)
+        with self._lock:
+            # (a watched answer is not kept if close() ran meanwhile)
+            if self._generation.get(root, 0) == generation and (sig is not None or self.inotify is not None):
+                self._answers[root] = (answer, dirs, sig)
+        return answer
+
+    def answer_line(self, line):
+        """Answer one protocol request line.
+        """
+        cmd, _, root = line.partition('\t')
+        if not root:
+            cmd, root = 'describe', cmd
+        try:
+            key = COMMANDS[cmd]
+            answer = self.get(root)
+            return json.dumps(answer if key is None else answer[key])
+        except Exception as e:  # pylint: disable=broad-except
+            return json.dumps({'root': root, 'error': str(e)})
+
+
+def serve(path, cache=None):
+    """Serve layout requests on the Unix socket ``path`` until interrupted.
+       A cache created here is closed on the way out, a ``cache`` passed
+       in is left open.
+    """
+    own = cache is None
+    cache = cache or LayoutCache()
+    try:
+        with make_server(path, cache.answer_line) as server:
+            server.serve_forever()
+    finally:
+        if own:
+            cache.close()
+
+
+class RemotePackage:
+    """Answers the common :class:`dkpkg.directory.Package` queries from a
+       running server.  Paths are returned as ``Path`` objects, like
+       the local package does.
+    """
+
+    def __init__(self, root, sock):
+        self.root = os.path.abspath(root)
+        self._file = sock.makefile('rwb')
+        self._sock = sock
+
+    def _ask(self, cmd):
+        self._file.write(f'{cmd}\t{self.root}\n'.encode('utf-8'))
+        self._file.flush()
+        answer = json.loads(self._file.readline())
+        if isinstance(answer, dict) and 'error' in answer:
+            raise OSError(answer['error'])
+        return answer
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        layout = self._ask('layout')
+        if name not in layout:
+            raise AttributeError(name)
+        return layout[name] if name in NAME_ROLES else Path(layout[name])
+
+    def is_django(self):
+        """Is this a Django package?
+        """
+        return self._ask('is_django')
+
+    def missing_dirs(self):
+        """Return all missing directories.
+        """
+        return [Path(d) for d in self._ask('missing_dirs')]
+
+    @property
+    def django_models(self):
+        """Return the path to the Django models.
+        """
+        models = self._ask('django_models')
+        return Path(models) if models is not None else None
+
+    def close(self):
+        """Close the connection to the server.
+        """
+        self._file.close()
+        self._sock.close()
+
+
+def connect(root, path):
+    """Return a :class:`RemotePackage` for ``root`` if a server is
+       listening on ``path``, otherwise a local
+       :class:`dkpkg.directory.Package`.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return Package(root)
+    return RemotePackage(root, sock)
@@ -0,0 +1,182 @@
+"""
+Compare two package layouts and plan the moves needed to reconcile them.
+
+Use :meth:`dkpkg.directory.DefaultPackage.diff`, or call
+:func:`diff_packages` directly::
+
+    d = Package('mypkg').diff(Package('mypkg', build=Path('mypkg/out')))
+    print(d.moved_roles)
+    apply_moves(d.plan_moves(), dry_run=True)
+
+Role paths are compared relative to each package's root, so two checkouts
+of the same repository in different locations compare equal.  Extra
+directories (:attr:`~dkpkg.directory.DefaultPackage.extra_dirs`) are
+compared by position, as the roles ``'source:1'``, ``'source:2'``...
+
+A move whose destination already exists is a conflict:
+:meth:`PackageDiff.conflicts` lists them, and :func:`apply_moves` refuses
+to run (also with ``dry_run=True``) instead of replacing or failing
+halfway.  Pass ``fs=a.fs`` to :func:`apply_moves` to apply the moves
+through the same filesystem backend the plan was made with.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .directory import existing_paths
+from .fs import LOCAL
+
+
+def _relative(pkg, path):
+    if path is None:
+        return None
+    return os.path.normpath(os.path.relpath(path, pkg.root))
+
+
+def _is_inside(path, parent):
+    return path != parent and path.startswith(parent + os.sep)
+
+
+class PackageDiff:
+    """The difference between two package layouts, ``a`` and ``b``.
+    """
+
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+        roles_a = a.expanded_role_dirs
+        roles_b = b.expanded_role_dirs
+
+        # one batched scan per side
+        exists_a = existing_paths(roles_a.values(), a.fs)
+        exists_b = existing_paths(roles_b.values(), b.fs)
+
+        #: role -> (relpath in a, relpath in b) for roles that moved.
+        self.moved_roles = {}
+        #: roles whose directory exists in a, but not in b.
+        self.only_in_a = []
+        #: roles whose directory exists in b, but not in a.
+        self.only_in_b = []
+
+        for role in list(roles_a) + [r for r in roles_b if r not in roles_a]:
+            path_a = roles_a.get(role)
+            path_b = roles_b.get(role)
+            rel_a = _relative(a, path_a)
+            rel_b = _relative(b, path_b)
+            if rel_a != rel_b:
+                self.moved_roles[role] = (rel_a, rel_b)
+            in_a = path_a is not None and path_a in exists_a
+            in_b = path_b is not None and path_b in exists_b
+            if in_a and not in_b:
+                self.only_in_a.append(role)
+            elif in_b and not in_a:
+                self.only_in_b.append(role)
+        self._exists_a = exists_a
+
+    def __bool__(self):
+        return bool(self.moved_roles or self.only_in_a or self.only_in_b)
+
+    def __repr__(self):
+        return (f'<PackageDiff moved={sorted(self.moved_roles)} '
+                f'only_in_a={self.only_in_a} only_in_b={self.only_in_b}>')
+
+    def plan_moves(self):
+        """Return a minimal list of ``(src, dst)`` renames that turns the
+           existing directories of ``a`` into the layout of ``b``.  The
+           renames stay inside ``a``'s root (``b``'s layout relative to
+           its own root is applied to ``a``).
+
+           A role that is moved along with a parent role (e.g. the
+           ``build_*`` directories when ``build`` is moved and they keep
+           their relative position) is not renamed separately.
+        """
+        roles_a = self.a.expanded_role_dirs
+        candidates = []
+        for role, (_, rel_b) in self.moved_roles.items():
+            src = roles_a.get(role)
+            if src is None or rel_b is None or src not in self._exists_a:
+                continue
+            dst = os.path.join(self.a.root, rel_b)
+            candidates.append((os.path.normpath(src), os.path.normpath(dst)))
+
+        moves = []
+        for src, dst in sorted(candidates, key=lambda m: len(m[0])):
+            # where src ends up after the enclosing moves planned so far
+            current = src
+            for psrc, pdst in moves:
+                if _is_inside(current, psrc):
+                    current = os.path.join(pdst, os.path.relpath(current, psrc))
+            if current != dst:
+                moves.append((current, dst))
+        return moves
+
+    def conflicts(self, moves=None):
+        """The moves (default :meth:`plan_moves`) whose destination already
+           exists in ``a``.
+        """
+        moves = self.plan_moves() if moves is None else moves
+        return _conflicts(moves, self.a.fs)
+
+
+def _conflicts(moves, fs):
+    """The moves in ``moves`` whose destination exists, and is not moved
+       away by an earlier move.
+    """
+    existing = fs.exists_many([dst for _, dst in moves])
+    result = []
+    for i, (src, dst) in enumerate(moves):
+        vacated = any(dst == s or _is_inside(dst, s) for s, _ in moves[:i])
+        if dst in existing and not vacated:
+            result.append((src, dst))
+    return result
+
+
+def diff_packages(a, b):
+    """Return a :class:`PackageDiff` between package layouts ``a`` and ``b``.
+    """
+    return PackageDiff(a, b)
+
+
+def _rename(fs, src, dst):
+    parent = os.path.dirname(dst)
+    if parent:
+        fs.makedirs(parent)
+    fs.rename(src, dst)
+
+
+def apply_moves(moves, dry_run=False, workers=None, fs=None):
+    """Execute the renames from :meth:`PackageDiff.plan_moves` on ``fs``
+       (default :data:`dkpkg.fs.LOCAL`).
+
+       A move that touches a path involved in an earlier move must run
+       after it, so moves are executed in batches of independent renames,
+       each batch in parallel.  Raises :class:`FileExistsError` before
+       touching anything if a destination already exists.  With
+       ``dry_run`` nothing is touched on disk.  Returns the list of moves
+       (that would be) performed.
+    """
+    fs = fs or LOCAL
+    moves = list(moves)
+    conflicts = _conflicts(moves, fs)
+    if conflicts:
+        raise FileExistsError(
+            'move destinations already exist: ' + ', '.join(dst for _, dst in conflicts))
+    if dry_run or not moves:
+        return moves
+
+    def related(p, q):
+        return p == q or _is_inside(p, q) or _is_inside(q, p)
+
+    batches = []
+    for src, dst in moves:
+        depth = 0
+        for i, batch in enumerate(batches):
+            if any(related(p, q) for p in (src, dst) for m in batch for q in m):
+                depth = i + 1
+        if depth == len(batches):
+            batches.append([])
+        batches[depth].append((src, dst))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in batches:
+            list(pool.map(lambda m: _rename(fs, *m), batch))
+    return moves
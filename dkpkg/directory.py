@@ -5,9 +5,116 @@ Use the :class:`Package` class.
 """
 # pylint: disable=too-many-instance-attributes,too-many-locals,R0903,line-too-long
 import configparser
+import copy
+import threading
 from io import StringIO
 from dkfileutils.path import Path
 
+from .fs import LOCAL
+
+
+def existing_paths(paths, fs=None):
+    """Return the subset of ``paths`` that exist on disk.
+
+       Each distinct parent directory is listed once with
+       ``fs.scandir`` (default :data:`dkpkg.fs.LOCAL`), instead of calling
+       ``stat`` on every path.
+    """
+    return (fs or LOCAL).exists_many(paths)
+
+
+#: How the default value of each derived role is computed, as
+#: ``(role, roles it is derived from, function)``, parents before children.
+DERIVATIONS = [
+    ('location', ('root',), lambda p: p.root.parent),
+    ('package_name', ('root',), lambda p: p.root.basename()),
+    ('name', ('package_name',), lambda p: p.package_name.replace('-', '')),
+    ('docs', ('root',), lambda p: p.root / 'docs'),
+    ('tests', ('root',), lambda p: p.root / 'tests'),
+    ('tests_js', ('root',), lambda p: p.root / 'tests' / 'js'),
+    ('build', ('root',), lambda p: p.root / 'build'),
+    ('source', ('root', 'name'), lambda p: p.root / p.name),
+    ('source_js', ('root',), lambda p: p.root / 'js'),
+    ('source_less', ('root',), lambda p: p.root / 'less'),
+    ('source_styles', ('root',), lambda p: p.root / 'styles'),
+    ('public_dir', ('root',), lambda p: p.root / 'public'),
+    ('django_templates', ('source',), lambda p: p.source / 'templates'),
+    ('django_static', ('source',), lambda p: p.source / 'static'),
+    ('django_models_dir', ('source',), lambda p: p.source / 'models'),
+    ('django_models_py', ('source',), lambda p: p.source / 'models.py'),
+    ('build_coverage', ('build',), lambda p: p.build / 'coverage'),
+    ('build_docs', ('build',), lambda p: p.build / 'docs'),
+    ('build_lintscore', ('build',), lambda p: p.build / 'lintscore'),
+    ('build_meta', ('build',), lambda p: p.build / 'meta'),
+    ('build_pytest', ('build',), lambda p: p.build / 'pytest'),
+    ('app_templates', ('django_templates', 'name'), lambda p: p.django_templates / p.name),
+]
+
+
+#: All roles that can be derived, and ``root``.
+ROLES = {'root'} | {role for role, _, _ in DERIVATIONS}
+
+#: Role -> the roles directly derived from it.
+ROLE_DEPENDENTS = {
+    parent: [role for role, parents, _ in DERIVATIONS if parent in parents]
+    for parent in ROLES
+}
+
+
+#: Roles whose values are names, not paths.
+NAME_ROLES = {'name', 'package_name'}
+
+_write_lock = threading.Lock()
+
+
+def _as_paths(kw):
+    """Convert the values of path roles in ``kw`` to :class:`Path`, so the
+       :data:`DERIVATIONS` can use ``/`` on them.
+    """
+    return {
+        k: Path(v) if isinstance(v, str) and k in ROLES and k not in NAME_ROLES else v
+        for k, v in kw.items()
+    }
+
+
+class _View:
+    """Attribute access to a state dict, for the :data:`DERIVATIONS`
+       functions.
+    """
+
+    def __init__(self, state):
+        self.__dict__ = state
+
+
+def _rederive(state, changed):
+    """Recompute (in the dict ``state``) the roles derived from the roles
+       in ``changed``, in dependency order.  Returns a list of
+       ``(role, old, new)``.
+    """
+    view = _View(state)
+    changed = set(changed)
+    changes = []
+    for role, parents, fn in DERIVATIONS:
+        if role in state['_overrides'] or changed.isdisjoint(parents):
+            continue
+        old = state.get(role)
+        new = state[role] = fn(view)
+        changed.add(role)
+        changes.append((role, old, new))
+    return changes
+
+
+def dependent_roles(role):
+    """All roles derived, directly or indirectly, from ``role``, in
+       dependency order.
+    """
+    found = {role}
+    for child, parents, _ in DERIVATIONS:
+        if not found.isdisjoint(parents):
+            found.add(child)
+    found.discard(role)
+    return [r for r, _, _ in DERIVATIONS if r in found]
+
 
 class DefaultPackage:
     """Default package directory layout (consider this abstract, both in the
@@ -59,7 +166,19 @@ class DefaultPackage:
         'build_pytest',
     }
 
+    #: Names that can be used for groups of roles, see :meth:`expand_roles`.
+    ROLE_GROUPS = {
+        'source_dirs': ['source', 'source_js', 'source_less'],
+        'django_dirs': ['django_static', 'django_templates', 'django_models'],
+        'build_dirs': ['build', 'build_coverage', 'build_docs',
+                       'build_lintscore', 'build_meta', 'build_pytest'],
+    }
+
     def __init__(self, root, **kw):  # pylint:disable=too-many-statements
+        #: The filesystem backend used for all I/O, see :mod:`dkpkg.fs`.
+        self._fs = kw.pop('fs', None) or LOCAL
+        #: Roles that were explicitly set, and are not re-derived.
+        self._overrides = {k for k, v in kw.items() if v}
         #: The abspath to the "working copy".
         self.root = kw.get('root') or Path(root).abspath()
         #: The abspath of the directory containing the root.
@@ -128,24 +247,66 @@ class DefaultPackage:
         for k, v in kw.items():
             setattr(self, k, v)
 
+    @property
+    def extra_dirs(self):
+        """Additional directories for roles that map to more than one path,
+           e.g. ``{'source': [...], 'tests': [...]}`` for a package with
+           several import roots or test trees.
+        """
+        return self.__dict__.get('_extra_dirs', {})
+
+    @extra_dirs.setter
+    def extra_dirs(self, val):
+        self._extra_dirs = {
+            role: [Path(p).abspath() for p in paths]
+            for role, paths in (val or {}).items()
+        }
+
+    @property
+    def fs(self):
+        """The filesystem backend (a :class:`dkpkg.fs.Backend`).
+        """
+        return self.__dict__.get('_fs', LOCAL)
+
+    def role_paths(self, role):
+        """All paths of ``role``: the primary path followed by any
+           :attr:`extra_dirs`.
+        """
+        primary = getattr(self, role, None)
+        return ([primary] if primary is not None else []) + self.extra_dirs.get(role, [])
+
     def is_django(self):
         """Is this a Django package?
         """
-        return any(d is not None and d.exists() for d in self.django_dirs)
+        probes = [self.django_models_dir, self.django_models_py]
+        probes += self.role_paths('django_static') + self.role_paths('django_templates')
+        for src in self.extra_dirs.get('source', []):
+            probes += [src / 'static', src / 'templates', src / 'models', src / 'models.py']
+        return bool(existing_paths(probes, self.fs))
 
     @property
     def source_dirs(self):
         """Directories containing source.
         """
-        return [self.source, self.source_js, self.source_less]
+        return (self.role_paths('source')
+                + self.role_paths('source_js')
+                + self.role_paths('source_less'))
+
+    @property
+    def metadata(self):
+        """Name, version, description and dependencies read from the
+           package's metadata files, see :mod:`dkpkg.metadata`.
+        """
+        from .metadata import read_metadata  # pylint: disable=import-outside-toplevel
+        return read_metadata(self)
 
     @property
     def django_models(self):
         """Return the path to the Django models.
         """
-        if self.django_models_dir.exists():
+        if self.fs.exists(self.django_models_dir):
             return self.django_models_dir
-        if self.django_models_py.exists():
+        if self.fs.exists(self.django_models_py):
             return self.django_models_py
         return None
 
@@ -153,7 +314,12 @@ class DefaultPackage:
     def django_dirs(self):
         """Directories containing/holding django specific files.
         """
-        return [self.django_static, self.django_templates, self.django_models]
+        extra = [src / sub for src in self.extra_dirs.get('source', [])
+                 for sub in ('static', 'templates')]
+        return (self.role_paths('django_static')
+                + self.role_paths('django_templates')
+                + extra
+                + [self.django_models])
 
     @property
     def build_dirs(self):
@@ -162,11 +328,56 @@ class DefaultPackage:
         return [self.build, self.build_coverage, self.build_docs,
                 self.build_lintscore, self.build_meta, self.build_pytest]
 
+    @property
+    def role_dirs(self):
+        """Mapping from role name to directory, in :attr:`all_dirs` order.
+        """
+        return {
+            'docs': self.docs,
+            'tests': self.tests,
+            'source': self.source,
+            'source_js': self.source_js,
+            'source_less': self.source_less,
+            'django_static': self.django_static,
+            'django_templates': self.django_templates,
+            'django_models': self.django_models,
+            'build': self.build,
+            'build_coverage': self.build_coverage,
+            'build_docs': self.build_docs,
+            'build_lintscore': self.build_lintscore,
+            'build_meta': self.build_meta,
+            'build_pytest': self.build_pytest,
+        }
+
+    @property
+    def expanded_role_dirs(self):
+        """:attr:`role_dirs` plus the :attr:`extra_dirs` of each role,
+           under the keys ``'<role>:1'``, ``'<role>:2'``...
+        """
+        result = {}
+        for role, path in self.role_dirs.items():
+            result[role] = path
+            for i, extra in enumerate(self.extra_dirs.get(role, []), 1):
+                result[f'{role}:{i}'] = extra
+        return result
+
+    def expand_roles(self, roles):
+        """Expand the group names in ``roles`` (see :attr:`ROLE_GROUPS`),
+           returning a list of unique role names.
+        """
+        result = []
+        for role in roles:
+            for r in self.ROLE_GROUPS.get(role, [role]):
+                if r not in result:
+                    result.append(r)
+        return result
+
     @property
     def all_dirs(self):
         """Return all package directories.
         """
-        return ([self.docs, self.tests]
+        return (self.role_paths('docs')
+                + self.role_paths('tests')
                 + self.source_dirs
                 + self.django_dirs
                 + self.build_dirs)
@@ -174,18 +385,74 @@ class DefaultPackage:
     def missing_dirs(self):
         """Return all missing directories.
         """
-        return [d for d in self.all_dirs if d is not None and not d.exists()]
+        dirs = [d for d in self.snapshot().all_dirs if d is not None]
+        existing = existing_paths(dirs, self.fs)
+        return [d for d in dirs if d not in existing]
 
-    def make_missing(self):
+    def make_missing(self, atomic=False, workers=None):
         """Create all missing directories.
+
+           With ``atomic=True`` either all directories are created or none
+           are, see :mod:`dkpkg.transaction`.
         """
+        if atomic:
+            from .transaction import make_missing_atomic  # pylint: disable=import-outside-toplevel
+            return make_missing_atomic(self, workers=workers)
         for d in self.missing_dirs():
-            d.makedirs()
+            self.fs.makedirs(d)
+        return None
+
+    def publish_to(self, public_dir=None, **kw):
+        """Sync build outputs into ``public_dir``, see :mod:`dkpkg.publish`.
+        """
+        from .publish import publish  # pylint: disable=import-outside-toplevel
+        return publish(self, public_dir, **kw)
+
+    def archive(self, fname, roles, **kw):
+        """Write the contents of ``roles`` to the archive ``fname``, see
+           :mod:`dkpkg.archive`.
+        """
+        from .archive import archive  # pylint: disable=import-outside-toplevel
+        return archive(self, fname, roles, **kw)
+
+    def restore(self, fname, **kw):
+        """Extract an archive written by :meth:`archive` into this layout.
+        """
+        from .archive import restore  # pylint: disable=import-outside-toplevel
+        return restore(self, fname, **kw)
+
+    def walk(self, roles=None, prune=None, types=None):
+        """Yield ``(role, entry)`` for everything below the directories of
+           ``roles``, visiting each directory once, see :mod:`dkpkg.walk`.
+        """
+        from .walk import walk  # pylint: disable=import-outside-toplevel
+        return walk(self, roles, prune=prune, types=types)
+
+    def diff(self, other):
+        """Compare this layout with ``other``, see :mod:`dkpkg.diff`.
+        """
+        from .diff import diff_packages  # pylint: disable=import-outside-toplevel
+        return diff_packages(self, other)
+
+    def snapshot(self):
+        """Return a copy of the current layout.
+
+           Taking a snapshot never blocks, and the snapshot is not affected
+           by later changes to this package.  :class:`Package` snapshots
+           are also read-only (assigning to them raises
+           :class:`AttributeError`).
+        """
+        snap = copy.copy(self)
+        snap.__dict__['_frozen'] = True
+        if '_listeners' in snap.__dict__:
+            snap.__dict__['_listeners'] = []
+        return snap
 
     def __str__(self):
-        keylen = max(len(k) for k in self.__dict__ if not k.startswith('_'))
+        state = self.__dict__
+        keylen = max(len(k) for k in state if not k.startswith('_'))
         lines = []
-        for k, v in sorted(self.__dict__.items()):
+        for k, v in sorted(state.items()):
             if k.startswith('_'):
                 continue
             if isinstance(v, Path):
@@ -194,13 +461,14 @@ class DefaultPackage:
         return '\n'.join(lines)
 
     def __repr__(self):
-        keys = [k for k in self.__dict__ if not k.startswith('_')]
+        state = self.__dict__
+        keys = [k for k in state if not k.startswith('_')]
         # keys += [p for p in dir(self.__class__)
         #         if isinstance(getattr(self.__class__, p), property)]
         keylen = max(len(k) for k in keys)
         lines = []
         for k in sorted(keys):
-            v = getattr(self, k)
+            v = state[k]
             lines.append(f'{k:>{keylen}} {v}')
         return '\n'.join(lines)
 
@@ -270,6 +538,8 @@ class Package(DefaultPackage):
             self.source = source
             self.django_templates = self.source / 'templates'
             self.django_static = self.source / 'static'
+            self.django_models_dir = self.source / 'models'
+            self.django_models_py = self.source / 'models.py'
         if source_js:
             self.source_js = source_js
         if source_less:
@@ -292,6 +562,105 @@ class Package(DefaultPackage):
             self.django_static = django_static
         if self.django_templates:
             self.app_templates = self.django_templates / self.name
+        self._listeners = []
+        self._ready = True
+
+    #: dkcode.Package compatibility names, and the attributes they alias.
+    ALIASES = {
+        'build_dir': 'build',
+        'lintscore_dir': 'build_lintscore',
+        'meta_dir': 'build_meta',
+        'coverage': 'build_coverage',
+        'coverage_dir': 'build_coverage',
+        'docs_dir': 'docs',
+        'package_dir': 'root',
+        'tests_dir': 'tests',
+        'pyroot_dir': 'root',
+        'source_dir': 'source',
+        'public': 'public_dir',
+        'pytest_dir': 'build_pytest',
+        'static_dir': 'django_static',
+        'templates_dir': 'django_templates',
+    }
+
+    def with_overrides(self, **kw):
+        """Return a copy of this layout with the roles in ``kw`` replaced.
+
+           Only roles derived from the replaced roles are recomputed (e.g.
+           ``build`` re-derives the ``build_*`` directories, and ``source``
+           the django directories); all other values are shared with this
+           package.  Roles that were explicitly overridden are kept.
+           Keys can also be the compatibility names in :attr:`ALIASES`;
+           anything else raises :class:`TypeError`.
+        """
+        kw = {self.ALIASES.get(k, k): v for k, v in kw.items()}
+        unknown = set(kw) - ROLES
+        if unknown:
+            raise TypeError(f'not layout roles: {", ".join(sorted(unknown))}')
+        kw = _as_paths(kw)
+        state = dict(self.__dict__)
+        state.pop('_frozen', None)
+        state['_overrides'] = state['_overrides'] | {k for k, v in kw.items() if v}
+        state['_listeners'] = []
+        state.update(kw)
+        _rederive(state, kw)
+        derived = object.__new__(type(self))
+        object.__setattr__(derived, '__dict__', state)
+        return derived
+
+    def update(self, **kw):
+        """Assign several attributes in one atomic step.
+
+           The new state (including re-derived roles) is built in a copy
+           and swapped in at once, so readers see either the old or the
+           new layout, never a mix.  Returns the list of
+           ``(role, old, new)`` changes.  Only changes to roles bump the
+           :attr:`revision` and are sent to listeners.
+        """
+        kw = _as_paths({self.ALIASES.get(k, k): v for k, v in kw.items()})
+        with _write_lock:
+            old = self.__dict__
+            if old.get('_frozen'):
+                raise AttributeError('a Package snapshot is read-only')
+            state = dict(old)
+            state['_overrides'] = old['_overrides'] | (set(kw) & ROLES)
+            state.update(kw)
+            changes = [(k, old.get(k), v) for k, v in kw.items() if k in ROLES]
+            changes += _rederive(state, kw)
+            if changes:
+                state['_revision'] = old.get('_revision', 0) + 1
+            object.__setattr__(self, '__dict__', state)
+        for listener in list(state['_listeners']):
+            for role, prev, new in changes:
+                listener(self, role, prev, new)
+        return changes
+
+    @property
+    def revision(self):
+        """Incremented by every change after construction.
+        """
+        return self.__dict__.get('_revision', 0)
+
+    def __setattr__(self, key, value):
+        # after construction, all assignments go through update(), which
+        # pins the assigned role and re-derives the roles depending on it.
+        if key == '__dict__' or not self.__dict__.get('_ready'):
+            super().__setattr__(key, value)
+        elif isinstance(getattr(type(self), key, None), property):
+            super().__setattr__(key, value)  # the setter assigns the real attribute
+        else:
+            self.update(**{key: value})
+
+    def subscribe(self, listener):
+        """Call ``listener(package, role, old, new)`` for every role that
+           changes when a role is assigned to, including derived roles.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Stop calling ``listener``.
+        """
+        self._listeners.remove(listener)
 
     # dkcode.Package compatibility
     @property
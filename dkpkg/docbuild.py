@@ -0,0 +1,149 @@
+"""
+Decide whether (and how much of) the documentation needs rebuilding.
+
+::
+
+    changes = docs_changes(pkg)
+    if not changes:
+        skip()
+    elif changes.full_rebuild:
+        sphinx_build(fresh=True)
+    else:
+        sphinx_build(touch=changes.stale_pages)
+    save_docs_manifest(pkg)
+
+The size and modification time of every file below ``docs`` and every
+``.py`` file below ``source`` is recorded in
+``build_meta/docs-manifest.json`` after a build; the next run compares
+against it.  Pages with ``automodule``/``autoclass``/... directives for a
+changed module are reported as stale.
+"""
+import json
+import os
+import re
+
+#: Name of the manifest file in ``build_meta``.
+MANIFEST = 'docs-manifest.json'
+
+#: Changes to these files (relative to ``docs``) require a full rebuild.
+FULL_REBUILD_FILES = {'conf.py'}
+
+_auto_re = re.compile(r'^\s*\.\.\s+auto(?:module|class|function|exception|data)::\s*([\w.]+)', re.MULTILINE)
+_module_re = re.compile(r'^\s*\.\.\s+(?:py:)?(?:current)?module::\s*([\w.]+)', re.MULTILINE)
+
+
+def manifest_path(pkg):
+    """The path of the docs manifest of ``pkg``.
+    """
+    return os.path.join(pkg.build_meta, MANIFEST)
+
+
+def _stat_tree(top, suffix=None):
+    result = {}
+    top = str(top)
+    if not os.path.isdir(top):
+        return result
+    for dirpath, dirnames, filenames in os.walk(top):
+        dirnames[:] = [d for d in dirnames if not d.startswith(('.', '_build', '__pycache__'))]
+        for f in filenames:
+            if suffix and not f.endswith(suffix):
+                continue
+            path = os.path.join(dirpath, f)
+            st = os.stat(path)
+            rel = os.path.relpath(path, top).replace(os.sep, '/')
+            result[rel] = [st.st_size, st.st_mtime_ns]
+    return result
+
+
+def scan(pkg):
+    """The current state of the documentation inputs of ``pkg``.
+    """
+    return {
+        'docs': _stat_tree(pkg.docs),
+        'source': _stat_tree(pkg.source, '.py'),
+    }
+
+
+def _changed(old, new):
+    return sorted(f for f in set(old) | set(new) if old.get(f) != new.get(f))
+
+
+def _module_name(pkg, rel):
+    """Dotted module name of the source file ``rel`` (relative to
+       ``source``).
+    """
+    parts = [pkg.name] + rel[:-len('.py')].split('/')
+    if parts[-1] == '__init__':
+        parts.pop()
+    return '.'.join(parts)
+
+
+class DocsChanges:
+    """What changed in the documentation inputs since the last build.
+    """
+
+    def __init__(self, docs, modules, full_rebuild, stale_pages):
+        #: Changed, added or removed files below ``docs``.
+        self.docs = docs
+        #: Dotted names of changed, added or removed source modules.
+        self.modules = modules
+        #: True if there is no previous build, or global config changed.
+        self.full_rebuild = full_rebuild
+        #: Pages (relative to ``docs``) that need to be rebuilt.
+        self.stale_pages = stale_pages
+
+    def __bool__(self):
+        return bool(self.docs or self.modules or self.full_rebuild)
+
+    def __repr__(self):
+        return (f'<DocsChanges full_rebuild={self.full_rebuild} docs={len(self.docs)} '
+                f'modules={len(self.modules)} stale_pages={len(self.stale_pages)}>')
+
+
+def _documented_modules(pkg, page):
+    try:
+        with open(os.path.join(pkg.docs, page), encoding='utf-8') as fp:
+            text = fp.read()
+    except (OSError, UnicodeDecodeError):
+        return set()
+    return set(_auto_re.findall(text)) | set(_module_re.findall(text))
+
+
+def docs_changes(pkg, current=None):
+    """Compare the current documentation inputs of ``pkg`` with the
+       manifest saved by the last build.
+    """
+    current = current or scan(pkg)
+    try:
+        with open(manifest_path(pkg)) as fp:
+            previous = json.load(fp)
+    except (OSError, ValueError):
+        previous = None
+
+    old = previous or {'docs': {}, 'source': {}}
+    docs = _changed(old['docs'], current['docs'])
+    modules = [_module_name(pkg, f) for f in _changed(old['source'], current['source'])]
+    full = previous is None or not FULL_REBUILD_FILES.isdisjoint(docs)
+
+    stale = set(f for f in docs if f in current['docs'])
+    if modules:
+        changed = set(modules)
+        for page in current['docs']:
+            if page.endswith(('.rst', '.md', '.txt')) and page not in stale:
+                documented = _documented_modules(pkg, page)
+                # m may also name a class or function inside a module
+                if any(m == c or m.startswith(c + '.') for m in documented for c in changed):
+                    stale.add(page)
+    return DocsChanges(docs, modules, full, sorted(stale))
+
+
+def save_docs_manifest(pkg, current=None):
+    """Record the current documentation inputs after a successful build.
+    """
+    current = current or scan(pkg)
+    os.makedirs(pkg.build_meta, exist_ok=True)
+    tmp = manifest_path(pkg) + '.tmp'
+    with open(tmp, 'w') as fp:
+        json.dump(current, fp)
+    os.replace(tmp, manifest_path(pkg))
+    return current
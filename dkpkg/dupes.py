@@ -0,0 +1,174 @@
+"""
+Find files that are duplicated across packages (vendored JavaScript,
+stylesheets and static assets).
+
+::
+
+    report = find_duplicates(packages, workers=8)
+    report.wasted                       # bytes that could be saved
+    for cluster in report.clusters:     # largest waste first
+        print(cluster.wasted, [path for _, _, path in cluster.files])
+    report.by_role()['django_static']   # clusters with a django_static copy
+    report.by_package()['mypkg']        # clusters with a copy in mypkg
+
+Candidates are narrowed in three rounds: files are grouped by size, then
+by a hash of their first :data:`PARTIAL_SIZE` bytes, and only the files
+that still collide are hashed completely.  The packages are walked (with
+:func:`dkpkg.walk.walk`) and each round of hashing is done in parallel.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from .walk import walk
+
+#: Roles searched by default.
+DUPE_ROLES = ['source_js', 'django_static', 'source_less', 'source_styles']
+
+#: Number of bytes hashed in the partial-hash round.
+PARTIAL_SIZE = 4096
+
+
+class DuplicateCluster:
+    """A set of files with identical contents.
+    """
+
+    def __init__(self, size, digest, files):
+        #: Size of each file in bytes.
+        self.size = size
+        #: Hex digest of the contents.
+        self.digest = digest
+        #: ``(package_name, role, path)`` of each copy, sorted.
+        self.files = sorted(files)
+
+    @property
+    def wasted(self):
+        """Bytes used by all copies but one.
+        """
+        return self.size * (len(self.files) - 1)
+
+    @property
+    def packages(self):
+        """Names of the packages with a copy.
+        """
+        return sorted({name for name, _, _ in self.files})
+
+    @property
+    def roles(self):
+        """Roles with a copy.
+        """
+        return sorted({role for _, role, _ in self.files})
+
+    def __repr__(self):
+        return f'<DuplicateCluster {len(self.files)} x {self.size} bytes {self.digest[:12]}>'
+
+
+class DuplicateReport:
+    """The duplicate clusters found by :func:`find_duplicates`.
+    """
+
+    def __init__(self, clusters):
+        #: All clusters, the most wasted bytes first.
+        self.clusters = sorted(clusters, key=lambda c: (-c.wasted, c.digest))
+
+    @property
+    def wasted(self):
+        """Total bytes used by redundant copies.
+        """
+        return sum(c.wasted for c in self.clusters)
+
+    def _group(self, key):
+        result = {}
+        for c in self.clusters:
+            for k in key(c):
+                result.setdefault(k, []).append(c)
+        return result
+
+    def by_role(self):
+        """``{role: [clusters with a copy in role]}``.
+        """
+        return self._group(lambda c: c.roles)
+
+    def by_package(self):
+        """``{package_name: [clusters with a copy in the package]}``.
+        """
+        return self._group(lambda c: c.packages)
+
+    def as_records(self):
+        """The clusters as JSON-serializable dicts.
+        """
+        return [{
+            'size': c.size,
+            'digest': c.digest,
+            'wasted': c.wasted,
+            'files': [{'package': name, 'role': role, 'path': str(path)}
+                      for name, role, path in c.files],
+        } for c in self.clusters]
+
+
+def _files(pkg, roles, min_size):
+    """``(size, (pkg, role, path))`` for every file of ``pkg`` in
+       ``roles``.
+    """
+    result = []
+    for role, entry in walk(pkg, roles):
+        if entry.is_file(follow_symlinks=False):
+            size = entry.stat(follow_symlinks=False).st_size
+            if size >= min_size:
+                result.append((size, (pkg, role, entry.path)))
+    return result
+
+
+def _partial_hash(item):
+    pkg, _, path = item
+    return hashlib.sha1(pkg.fs.head(path, PARTIAL_SIZE)).hexdigest()
+
+
+def _full_hash(item):
+    pkg, _, path = item
+    h = hashlib.sha1()
+    for chunk in pkg.fs.chunks(path):
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def _split(groups, hashfn, pool):
+    """Split each group in ``groups`` (``{key: [item, ...]}``) by
+       ``hashfn(item)``, keeping only the sub-groups with more than one
+       item.
+    """
+    keys, items = [], []
+    for key, group in groups.items():
+        for item in group:
+            keys.append(key)
+            items.append(item)
+    result = {}
+    for key, item, digest in zip(keys, items, pool.map(hashfn, items)):
+        result.setdefault(key + (digest,), []).append(item)
+    return {k: v for k, v in result.items() if len(v) > 1}
+
+
+def find_duplicates(packages, roles=None, workers=None, min_size=1):
+    """Find files with identical contents in the directories of ``roles``
+       (default :data:`DUPE_ROLES`) of ``packages``, both within and
+       across packages.  Files smaller than ``min_size`` bytes are
+       ignored.  Returns a :class:`DuplicateReport`.
+    """
+    roles = roles or DUPE_ROLES
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        by_size = {}
+        for files in pool.map(lambda p: _files(p, roles, min_size), packages):
+            for size, item in files:
+                by_size.setdefault((size,), []).append(item)
+        groups = {k: v for k, v in by_size.items() if len(v) > 1}
+
+        groups = _split(groups, _partial_hash, pool)
+        # files that fit in the partial hash are already completely hashed
+        small = {k: v for k, v in groups.items() if k[0] <= PARTIAL_SIZE}
+        large = {k: v for k, v in groups.items() if k[0] > PARTIAL_SIZE}
+        groups = {**{(k[0], k[1]): v for k, v in small.items()},
+                  **{(k[0], k[2]): v for k, v in _split(large, _full_hash, pool).items()}}
+
+    return DuplicateReport(
+        DuplicateCluster(size, digest, [(pkg.package_name, role, path) for pkg, role, path in items])
+        for (size, digest), items in groups.items()
+    )
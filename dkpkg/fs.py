@@ -0,0 +1,349 @@
+"""
+Filesystem backends for the I/O done by :class:`dkpkg.directory.Package`.
+
+Pass a backend to the package with ``Package(root, fs=backend)``; the
+default is :data:`LOCAL`.  :class:`MemoryBackend` keeps the whole tree in
+memory, which is useful for tests and for simulating layouts::
+
+    fs = MemoryBackend()
+    fs.write('/src/mypkg/mypkg/models.py', b'')
+    Package('/src/mypkg', fs=fs).is_django()       # True
+
+Other backends (e.g. remote or object stores) subclass :class:`Backend`
+and implement its methods.
+
+Reading the metadata files (:mod:`dkpkg.metadata`), publishing
+(:mod:`dkpkg.publish`) and archiving (:mod:`dkpkg.archive`) always use the
+local disk.
+"""
+import os
+import stat as stat_module
+import threading
+
+
+class Backend:
+    """The filesystem operations used by dkpkg.
+    """
+
+    def exists(self, path):
+        """Does ``path`` exist?
+        """
+        raise NotImplementedError
+
+    def isdir(self, path):
+        """Is ``path`` a directory?
+        """
+        raise NotImplementedError
+
+    def isfile(self, path):
+        """Is ``path`` a regular file?
+        """
+        raise NotImplementedError
+
+    def scandir(self, path):
+        """Iterate over the entries of the directory ``path``.  Entries
+           have the interface of ``os.DirEntry``.
+        """
+        raise NotImplementedError
+
+    def mkdir(self, path):
+        """Create the directory ``path`` (its parent must exist).
+        """
+        raise NotImplementedError
+
+    def rmdir(self, path):
+        """Remove the empty directory ``path``.
+        """
+        raise NotImplementedError
+
+    def remove(self, path):
+        """Remove the file ``path``.
+        """
+        raise NotImplementedError
+
+    def rename(self, src, dst):
+        """Rename the file or directory ``src`` to ``dst``.
+        """
+        raise NotImplementedError
+
+    def read(self, path):
+        """Return the contents of the file ``path`` as bytes.
+        """
+        raise NotImplementedError
+
+    def write(self, path, data):
+        """Write the bytes ``data`` to the file ``path``.
+        """
+        raise NotImplementedError
+
+    def create(self, path, data=b''):
+        """Create the file ``path`` containing ``data``, raising
+           :class:`FileExistsError` if it already exists (atomically,
+           so it can be used as a lock).
+        """
+        raise NotImplementedError
+
+    def head(self, path, size):
+        """Return (at most) the first ``size`` bytes of the file ``path``.
+        """
+        return self.read(path)[:size]
+
+    def chunks(self, path, size=1 << 16):
+        """Iterate over the contents of the file ``path`` in blocks of
+           (about) ``size`` bytes.
+        """
+        data = self.read(path)
+        for pos in range(0, len(data), size):
+            yield data[pos:pos + size]
+
+    def makedirs(self, path):
+        """Create the directory ``path`` and any missing parents.
+        """
+        path = os.path.normpath(path)
+        if self.isdir(path):
+            return
+        parent = os.path.dirname(path)
+        if parent and parent != path:
+            self.makedirs(parent)
+        self.mkdir(path)
+
+    def exists_many(self, paths):
+        """Return the subset of ``paths`` that exist, listing each distinct
+           parent directory only once.
+        """
+        listings = {}
+        found = set()
+        for p in paths:
+            if p is None:
+                continue
+            parent, name = os.path.split(os.path.normpath(p))
+            if parent not in listings:
+                try:
+                    listings[parent] = {e.name for e in self.scandir(parent or os.curdir)}
+                except OSError:
+                    listings[parent] = set()
+            if name in listings[parent]:
+                found.add(p)
+        return found
+
+
+class LocalBackend(Backend):
+    """The local filesystem.
+    """
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def isdir(self, path):
+        return os.path.isdir(path)
+
+    def isfile(self, path):
+        return os.path.isfile(path)
+
+    def scandir(self, path):
+        with os.scandir(path) as it:
+            yield from it
+
+    def mkdir(self, path):
+        os.mkdir(path)
+
+    def rmdir(self, path):
+        os.rmdir(path)
+
+    def remove(self, path):
+        os.remove(path)
+
+    def rename(self, src, dst):
+        os.rename(src, dst)
+
+    def read(self, path):
+        with open(path, 'rb') as fp:
+            return fp.read()
+
+    def write(self, path, data):
+        with open(path, 'wb') as fp:
+            fp.write(data)
+
+    def create(self, path, data=b''):
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+
+    def head(self, path, size):
+        with open(path, 'rb') as fp:
+            return fp.read(size)
+
+    def chunks(self, path, size=1 << 16):
+        with open(path, 'rb') as fp:
+            yield from iter(lambda: fp.read(size), b'')
+
+    def makedirs(self, path):
+        os.makedirs(path, exist_ok=True)
+
+
+class _Stat:
+    def __init__(self, mode, size):
+        self.st_mode = mode
+        self.st_size = size
+        self.st_mtime = self.st_mtime_ns = 0
+
+
+class MemoryEntry:
+    """An ``os.DirEntry`` lookalike for :class:`MemoryBackend`.
+    """
+
+    def __init__(self, fs, path):
+        self._fs = fs
+        self.path = path
+        self.name = os.path.basename(path)
+
+    def is_dir(self, follow_symlinks=True):  # pylint: disable=unused-argument
+        return self.path in self._fs.dirs
+
+    def is_file(self, follow_symlinks=True):  # pylint: disable=unused-argument
+        return self.path in self._fs.files
+
+    def is_symlink(self):
+        return False
+
+    def stat(self, follow_symlinks=True):  # pylint: disable=unused-argument
+        if self.is_dir():
+            return _Stat(stat_module.S_IFDIR | 0o755, 0)
+        return _Stat(stat_module.S_IFREG | 0o644, len(self._fs.files[self.path]))
+
+    def __fspath__(self):
+        return self.path
+
+
+class MemoryBackend(Backend):
+    """A filesystem that only exists in memory.
+
+       Relative paths are resolved against the current directory, like on
+       the local filesystem.
+    """
+
+    def __init__(self):
+        #: absolute paths of all directories
+        self.dirs = set()
+        #: absolute path -> contents
+        self.files = {}
+        self._children = {}
+        self._lock = threading.Lock()
+        self._add_parents(os.path.abspath(os.sep))
+
+    def _key(self, path):
+        return os.path.abspath(path)
+
+    def _link(self, path):
+        parent = os.path.dirname(path)
+        if parent != path:
+            self._children.setdefault(parent, set()).add(path)
+
+    def _add_parents(self, path):
+        while path not in self.dirs:
+            self.dirs.add(path)
+            self._link(path)
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+
+    def exists(self, path):
+        key = self._key(path)
+        return key in self.dirs or key in self.files
+
+    def isdir(self, path):
+        return self._key(path) in self.dirs
+
+    def isfile(self, path):
+        return self._key(path) in self.files
+
+    def scandir(self, path):
+        key = self._key(path)
+        if key not in self.dirs:
+            raise FileNotFoundError(path)
+        for p in sorted(self._children.get(key, ())):
+            yield MemoryEntry(self, p)
+
+    def mkdir(self, path):
+        key = self._key(path)
+        if self.exists(key):
+            raise FileExistsError(path)
+        if os.path.dirname(key) not in self.dirs:
+            raise FileNotFoundError(path)
+        self.dirs.add(key)
+        self._link(key)
+
+    def rmdir(self, path):
+        key = self._key(path)
+        if key not in self.dirs:
+            raise FileNotFoundError(path)
+        if self._children.get(key):
+            raise OSError(f'directory not empty: {path}')
+        self.dirs.remove(key)
+        self._children.pop(key, None)
+        self._children[os.path.dirname(key)].discard(key)
+
+    def remove(self, path):
+        key = self._key(path)
+        if key not in self.files:
+            raise FileNotFoundError(path)
+        del self.files[key]
+        self._children[os.path.dirname(key)].discard(key)
+
+    def rename(self, src, dst):
+        src, dst = self._key(src), self._key(dst)
+        if not self.exists(src):
+            raise FileNotFoundError(src)
+        if self.exists(dst):
+            raise FileExistsError(dst)
+        if os.path.dirname(dst) not in self.dirs:
+            raise FileNotFoundError(dst)
+        prefix = src + os.sep
+        dirs = sorted(d for d in self.dirs if d == src or d.startswith(prefix))
+        files = [f for f in self.files if f == src or f.startswith(prefix)]
+        self._children[os.path.dirname(src)].discard(src)
+        for d in dirs:
+            self.dirs.remove(d)
+            self._children.pop(d, None)
+        for d in dirs:
+            self.dirs.add(dst + d[len(src):])
+            self._link(dst + d[len(src):])
+        for f in files:
+            self.files[dst + f[len(src):]] = self.files.pop(f)
+            self._link(dst + f[len(src):])
+
+    def makedirs(self, path):
+        key = self._key(path)
+        if key in self.files:
+            raise FileExistsError(path)
+        self._add_parents(key)
+
+    def read(self, path):
+        try:
+            return self.files[self._key(path)]
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    def create(self, path, data=b''):
+        with self._lock:
+            if self.exists(path):
+                raise FileExistsError(path)
+            if not self.isdir(os.path.dirname(self._key(path))):
+                raise FileNotFoundError(path)
+            self.write(path, data)
+
+    def write(self, path, data):
+        """Write ``data`` to ``path``, creating parent directories as
+           needed.
+        """
+        key = self._key(path)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._add_parents(os.path.dirname(key))
+        self.files[key] = data
+        self._link(key)
+
+
+#: The default backend.
+LOCAL = LocalBackend()
@@ -0,0 +1,149 @@
+"""
+Dependency graph between local packages.
+
+Edges are taken from each package's declared dependencies
+(:attr:`dkpkg.directory.DefaultPackage.metadata`) and its
+``requirements.txt``, including editable ``-e ../sibling`` lines.  Only
+dependencies that resolve to one of the given packages become edges::
+
+    g = DependencyGraph(Package(p) for p in roots)
+    for level in g.build_levels():
+        build_in_parallel(level)
+"""
+import os
+import re
+
+_name_re = re.compile(r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)')
+_egg_re = re.compile(r'#egg=([A-Za-z0-9][A-Za-z0-9._-]*)')
+
+
+def normalize(name):
+    """Normalize a distribution name (PEP 503).
+    """
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def requirement_name(line):
+    """Return the normalized distribution name of the requirement ``line``,
+       or ``None``.
+    """
+    m = _name_re.match(line.split(';')[0])
+    return normalize(m.group(1)) if m else None
+
+
+def read_requirements(fname):
+    """Parse a requirements file.
+
+       Returns ``(names, paths)``: the normalized distribution names, and
+       the absolute paths of local editable (``-e <path>``) requirements.
+    """
+    names, paths = [], []
+    base = os.path.dirname(os.path.abspath(fname))
+    with open(fname, encoding='utf-8') as fp:
+        for line in fp:
+            line = line.split(' #')[0].strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith(('-e ', '--editable ')):
+                target = line.split(None, 1)[1].strip()
+                egg = _egg_re.search(target)
+                if egg:
+                    names.append(normalize(egg.group(1)))
+                elif '://' not in target and '+' not in target.split('/')[0]:
+                    paths.append(os.path.normpath(os.path.join(base, target)))
+            elif not line.startswith('-'):
+                name = requirement_name(line)
+                if name:
+                    names.append(name)
+    return names, paths
+
+
+class CycleError(ValueError):
+    """The dependency graph contains a cycle.
+    """
+
+
+class DependencyGraph:
+    """Dependencies between the given packages.
+
+       Nodes are the packages' roots.
+    """
+
+    def __init__(self, packages):
+        #: root -> package
+        self.packages = {}
+        by_name = {}
+        for pkg in packages:
+            self.packages[pkg.root] = pkg
+            by_name[normalize(pkg.package_name)] = pkg.root
+            if pkg.metadata.name:
+                by_name[normalize(pkg.metadata.name)] = pkg.root
+
+        #: root -> set of roots it depends on
+        self.edges = {root: set() for root in self.packages}
+        #: root -> set of roots that depend on it
+        self.reverse = {root: set() for root in self.packages}
+
+        for root, pkg in self.packages.items():
+            names = [requirement_name(r) for r in pkg.metadata.dependencies]
+            paths = []
+            reqs = os.path.join(root, 'requirements.txt')
+            if os.path.isfile(reqs):
+                rnames, paths = read_requirements(reqs)
+                names += rnames
+            targets = {by_name.get(n) for n in names}
+            targets |= {p for p in paths if p in self.packages}
+            targets.discard(None)
+            targets.discard(root)
+            for target in targets:
+                self.edges[root].add(target)
+                self.reverse[target].add(root)
+
+    def dependencies(self, root):
+        """Direct local dependencies of ``root``.
+        """
+        return set(self.edges[root])
+
+    def dependents(self, root, transitive=False):
+        """Packages that depend on ``root`` (directly, or also indirectly
+           if ``transitive`` is true).
+        """
+        if not transitive:
+            return set(self.reverse[root])
+        seen = set()
+        todo = [root]
+        while todo:
+            for dep in self.reverse[todo.pop()]:
+                if dep not in seen:
+                    seen.add(dep)
+                    todo.append(dep)
+        return seen
+
+    def build_levels(self):
+        """Group the packages into levels, where every package only depends
+           on packages in earlier levels.  Packages in the same level can be
+           built concurrently.
+
+           Raises :class:`CycleError` if there is a dependency cycle.
+        """
+        remaining = {root: len(deps) for root, deps in self.edges.items()}
+        level = sorted(root for root, n in remaining.items() if n == 0)
+        levels = []
+        while level:
+            levels.append(level)
+            nxt = []
+            for root in level:
+                del remaining[root]
+                for dependent in self.reverse[root]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        nxt.append(dependent)
+            level = sorted(nxt)
+        if remaining:
+            raise CycleError(f'dependency cycle between: {sorted(remaining)}')
+        return levels
+
+    def topological_order(self):
+        """All packages, dependencies before dependents.
+        """
+        return [root for level in self.build_levels() for root in level]
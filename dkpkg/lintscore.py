@@ -0,0 +1,133 @@
+"""
+History of lint scores, stored in ``build_lintscore``.
+
+::
+
+    history = LintHistory(pkg.build_lintscore)
+    history.ingest(*parse_pylint(pylint_output))
+    history.regressions()          # files with more messages than last run
+
+Each run appends one line to ``history.jsonl`` holding the score and only
+the files whose message count changed (as ``[old, new]``), so ingestion
+appends a small record and comparing with the previous run only reads the
+last record.  The current count per file is kept in ``latest.json``.
+"""
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_message_re = re.compile(r'^(.+?):\d+:(?:\d+:)?\s*[A-Z]\d{4}\b', re.MULTILINE)
+_score_re = re.compile(r'rated at (-?[\d.]+)/10')
+
+
+def parse_pylint(text):
+    """Return ``(score, {filename: message count})`` from pylint's text
+       output (the default ``path:line:col: CODE: message`` format).
+    """
+    counts = {}
+    for m in _message_re.finditer(text):
+        fname = m.group(1).replace('\\', '/')
+        counts[fname] = counts.get(fname, 0) + 1
+    m = _score_re.search(text)
+    return (float(m.group(1)) if m else None), counts
+
+
+def _last_line(fname):
+    """The last non-empty line of ``fname``, read from the end.
+    """
+    with open(fname, 'rb') as fp:
+        fp.seek(0, os.SEEK_END)
+        pos = fp.tell()
+        buf = b''
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            fp.seek(pos)
+            buf = fp.read(step) + buf
+            lines = buf.rstrip(b'\n').split(b'\n')
+            if len(lines) > 1 or pos == 0:
+                return lines[-1].decode('utf-8')
+    return ''
+
+
+class LintHistory:
+    """Append-only lint score history in ``directory``.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.history = os.path.join(directory, 'history.jsonl')
+        self.latest = os.path.join(directory, 'latest.json')
+
+    def counts(self):
+        """Current message count per file.
+        """
+        try:
+            with open(self.latest) as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {}
+
+    def ingest(self, score, counts, timestamp=None):
+        """Record a lint run.  Returns the appended record.
+        """
+        old = self.counts()
+        changed = {
+            f: [old.get(f, 0), counts.get(f, 0)]
+            for f in set(old) | set(counts)
+            if old.get(f, 0) != counts.get(f, 0)
+        }
+        record = {
+            'time': time.time() if timestamp is None else timestamp,
+            'score': score,
+            'changed': dict(sorted(changed.items())),
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.history, 'a') as fp:
+            fp.write(json.dumps(record) + '\n')
+        tmp = self.latest + '.tmp'
+        with open(tmp, 'w') as fp:
+            json.dump({f: n for f, n in counts.items() if n}, fp)
+        os.replace(tmp, self.latest)
+        return record
+
+    def last(self):
+        """The most recent record, or ``None``.
+        """
+        if not os.path.exists(self.history):
+            return None
+        line = _last_line(self.history)
+        return json.loads(line) if line else None
+
+    def regressions(self):
+        """Files whose message count went up in the most recent run, as
+           ``{filename: [old, new]}``.
+        """
+        last = self.last() or {'changed': {}}
+        return {f: c for f, c in last['changed'].items() if c[1] > c[0]}
+
+    def records(self):
+        """Iterate over all records, oldest first.
+        """
+        if not os.path.exists(self.history):
+            return
+        with open(self.history) as fp:
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def latest_scores(packages, workers=None):
+    """The most recent lint score of each package, as
+       ``{package_name: score}`` (``None`` if there is no history).
+    """
+    packages = list(packages)
+
+    def score(pkg):
+        last = LintHistory(pkg.build_lintscore).last()
+        return last and last['score']
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip((p.package_name for p in packages), pool.map(score, packages)))
@@ -0,0 +1,228 @@
+"""
+Static extraction of package metadata.
+
+Reads the name, version, description and dependencies of a package from
+``setup.py`` (parsed with ``ast``, never executed), ``setup.cfg``,
+``pyproject.toml``, ``dkbuild.yml`` and the ``__version__`` of the source
+package::
+
+    md = Package('.').metadata
+    print(md.name, md.version, md.dependencies)
+
+Later sources in :data:`SOURCES` take precedence over earlier ones, and
+``__version__`` is only used when none of them specify a version.
+Results are cached, and re-read only when one of the files changes.
+``pyproject.toml`` needs ``tomllib`` (or ``tomli``) and ``dkbuild.yml``
+needs PyYAML; the files are ignored if those are not installed.
+"""
+import ast
+import configparser
+import os
+
+try:
+    import tomllib
+except ImportError:  # pragma: nocover
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+try:
+    import yaml
+except ImportError:  # pragma: nocover
+    yaml = None
+
+#: Metadata files, in increasing order of precedence.
+SOURCES = ['dkbuild.yml', 'setup.py', 'setup.cfg', 'pyproject.toml']
+
+_cache = {}
+
+
+class Metadata:
+    """Package metadata.  Fields that could not be determined are ``None``.
+    """
+
+    def __init__(self, name=None, version=None, description=None, dependencies=None):
+        self.name = name
+        self.version = version
+        self.description = description
+        #: List of requirement strings.
+        self.dependencies = dependencies or []
+
+    def update(self, values):
+        """Set the fields that have a value in the dict ``values``.
+        """
+        for k, v in values.items():
+            if v:
+                setattr(self, k, v)
+
+    def __eq__(self, other):
+        return isinstance(other, Metadata) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return f'Metadata(name={self.name!r}, version={self.version!r})'
+
+
+def _evaluate(node, names):
+    """Evaluate a literal expression, resolving simple names from
+       ``names``.  Returns ``None`` for anything else.
+    """
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return names.get(node.id)
+    if isinstance(node, (ast.List, ast.Tuple)):
+        items = [_evaluate(elt, names) for elt in node.elts]
+        return None if None in items else items
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == 'strip' and not node.args):
+        value = _evaluate(node.func.value, names)
+        return value.strip() if isinstance(value, str) else None
+    return None
+
+
+def _module_names(tree):
+    """Module level ``name = <literal>`` assignments, and ``__doc__``.
+    """
+    names = {'__doc__': ast.get_docstring(tree, clean=False)}
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            value = _evaluate(node.value, names)
+            for target in node.targets:
+                if isinstance(target, ast.Name) and value is not None:
+                    names[target.id] = value
+    return names
+
+
+def read_setup_py(fname):
+    """Return the literal keyword arguments to ``setup()`` in ``fname``.
+    """
+    with open(fname, encoding='utf-8') as fp:
+        return parse_setup_py(fp.read())
+
+
+def parse_setup_py(text):
+    """Return the literal keyword arguments to ``setup()`` in the source
+       code ``text``.
+    """
+    try:
+        tree = ast.parse(text)
+    except SyntaxError:
+        return {}
+    names = _module_names(tree)
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        func = getattr(node.func, 'attr', getattr(node.func, 'id', None))
+        if func == 'setup':
+            return {kw.arg: _evaluate(kw.value, names)
+                    for kw in node.keywords if kw.arg}
+    return {}
+
+
+def read_version_py(fname):
+    """Return the literal ``__version__`` in ``fname``.
+    """
+    with open(fname, encoding='utf-8') as fp:
+        try:
+            tree = ast.parse(fp.read())
+        except SyntaxError:
+            return None
+    version = _module_names(tree).get('__version__')
+    return version if isinstance(version, str) else None
+
+
+def _from_setup_py(fname):
+    kw = read_setup_py(fname)
+    return {
+        'name': kw.get('name'),
+        'version': kw.get('version'),
+        'description': kw.get('description'),
+        'dependencies': kw.get('install_requires'),
+    }
+
+
+def _from_setup_cfg(fname):
+    cp = configparser.ConfigParser(interpolation=None)
+    cp.read(fname, encoding='utf-8')
+
+    def get(section, key):
+        value = cp.get(section, key, fallback=None)
+        if value and value.startswith(('attr:', 'file:')):
+            return None
+        return value
+
+    requires = get('options', 'install_requires')
+    return {
+        'name': get('metadata', 'name'),
+        'version': get('metadata', 'version'),
+        'description': get('metadata', 'description'),
+        'dependencies': [r.strip() for r in (requires or '').splitlines() if r.strip()],
+    }
+
+
+def _from_pyproject_toml(fname):
+    if tomllib is None:  # pragma: nocover
+        return {}
+    with open(fname, 'rb') as fp:
+        project = tomllib.load(fp).get('project', {})
+    return {
+        'name': project.get('name'),
+        'version': project.get('version'),
+        'description': project.get('description'),
+        'dependencies': project.get('dependencies'),
+    }
+
+
+def _from_dkbuild_yml(fname):
+    if yaml is None:  # pragma: nocover
+        return {}
+    with open(fname, encoding='utf-8') as fp:
+        package = (yaml.safe_load(fp) or {}).get('package') or {}
+    return {
+        'name': package.get('name'),
+        'version': str(package['version']) if package.get('version') else None,
+        'description': package.get('description'),
+    }
+
+
+_READERS = {
+    '__init__.py': lambda fname: {'version': read_version_py(fname)},
+    'dkbuild.yml': _from_dkbuild_yml,
+    'setup.py': _from_setup_py,
+    'setup.cfg': _from_setup_cfg,
+    'pyproject.toml': _from_pyproject_toml,
+}
+
+
+def _signature(paths):
+    """The files in ``paths`` that exist, with their modification times
+       and sizes.
+    """
+    sig = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            sig.append((p, st.st_mtime_ns, st.st_size))
+        except OSError:
+            pass
+    return tuple(sig)
+
+
+def read_metadata(pkg):
+    """Return the :class:`Metadata` of ``pkg``, re-using the cached value if
+       none of the metadata files have changed.
+    """
+    sig = _signature(
+        [os.path.join(pkg.source, '__init__.py')]
+        + [os.path.join(pkg.root, f) for f in SOURCES]
+    )
+    cached = _cache.get(pkg.root)
+    if cached and cached[0] == sig:
+        return cached[1]
+
+    md = Metadata()
+    for fname, _, _ in sig:
+        md.update(_READERS[os.path.basename(fname)](fname))
+    _cache[pkg.root] = (sig, md)
+    return md
@@ -0,0 +1,172 @@
+"""
+Incremental publishing of build outputs to the ``public`` directory.
+
+::
+
+    Package('.').publish_to()                     # build_docs, build_coverage
+    Package('.').publish_to('/srv/www', roles=['build_docs'], checksum=True)
+
+Each role directory is synced to a sub-directory of ``public_dir`` named
+after the role (``build_docs`` -> ``public/docs``).  Files are skipped
+when size and modification time match (and, with ``checksum=True``, also
+when the contents match), and files that no longer exist in the build
+output are deleted.
+
+New and changed files are cloned (reflinked, sharing the data blocks
+copy-on-write) where the filesystem supports it (Linux btrfs, XFS...),
+and copied otherwise.  With ``link=True`` they are hard-linked instead
+when possible; this is cheaper, but a build step that later rewrites a
+file in place then also changes the published file.
+"""
+import hashlib
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # pragma: nocover
+    fcntl = None
+
+#: Roles published by default.
+PUBLISH_ROLES = ('build_docs', 'build_coverage')
+
+#: The Linux ``FICLONE`` ioctl request.
+_FICLONE = 0x40049409
+
+
+class SyncResult:
+    """Relative paths of the files handled by :func:`sync_tree`.
+    """
+
+    def __init__(self):
+        self.copied = []
+        self.cloned = []
+        self.linked = []
+        self.unchanged = []
+        self.deleted = []
+
+    def extend(self, other, prefix):
+        """Add the results of ``other``, with paths prefixed by ``prefix``.
+        """
+        for attr in ('copied', 'cloned', 'linked', 'unchanged', 'deleted'):
+            getattr(self, attr).extend(os.path.join(prefix, p) for p in getattr(other, attr))
+
+    def __repr__(self):
+        return (f'<SyncResult copied={len(self.copied)} cloned={len(self.cloned)} linked={len(self.linked)} '
+                f'unchanged={len(self.unchanged)} deleted={len(self.deleted)}>')
+
+
+def _digest(fname):
+    h = hashlib.sha256()
+    with open(fname, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+def _files(top):
+    """Relative paths of all files (and directories) below ``top``.
+    """
+    files, dirs = {}, set()
+    for dirpath, dirnames, filenames in os.walk(top):
+        rel = os.path.relpath(dirpath, top)
+        for d in dirnames:
+            dirs.add(os.path.normpath(os.path.join(rel, d)))
+        for f in filenames:
+            path = os.path.join(dirpath, f)
+            files[os.path.normpath(os.path.join(rel, f))] = os.stat(path)
+    return files, dirs
+
+
+def _unchanged(src, sst, dst, dst_stat, checksum):
+    if dst_stat is None or sst.st_size != dst_stat.st_size:
+        return False
+    if (sst.st_dev, sst.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    if sst.st_mtime_ns == dst_stat.st_mtime_ns:
+        return True
+    return checksum and _digest(src) == _digest(dst)
+
+
+def _clone(src, dst):
+    """Make ``dst`` a reflink of ``src``.  Returns False if the platform or
+       filesystem does not support it.
+    """
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return False
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        except OSError:
+            return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def _transfer(src, dst, link):
+    """Hard-link (if ``link``), clone or copy ``src`` to ``dst``.  Returns
+       ``'linked'``, ``'cloned'`` or ``'copied'``.
+    """
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + '.dkpkg-tmp'
+    if link:
+        try:
+            os.link(src, tmp)
+            os.replace(tmp, dst)
+            return 'linked'
+        except OSError:
+            pass
+    outcome = 'cloned' if _clone(src, tmp) else 'copied'
+    if outcome == 'copied':
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    return outcome
+
+
+def sync_tree(src, dst, checksum=False, link=False, delete=True, workers=None):
+    """Make the directory ``dst`` an up-to-date mirror of ``src``.  With
+       ``link=True`` files are hard-linked instead of copied where possible.
+    """
+    result = SyncResult()
+    src_files, src_dirs = _files(src) if os.path.isdir(src) else ({}, set())
+    dst_files, dst_dirs = _files(dst) if os.path.isdir(dst) else ({}, set())
+
+    def sync(rel):
+        s = os.path.join(src, rel)
+        d = os.path.join(dst, rel)
+        if _unchanged(s, src_files[rel], d, dst_files.get(rel), checksum):
+            return rel, 'unchanged'
+        return rel, _transfer(s, d, link)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rel, outcome in pool.map(sync, sorted(src_files)):
+            getattr(result, outcome).append(rel)
+
+    if delete:
+        for rel in sorted(set(dst_files) - set(src_files)):
+            os.remove(os.path.join(dst, rel))
+            result.deleted.append(rel)
+        for rel in sorted(dst_dirs - src_dirs, key=len, reverse=True):
+            shutil.rmtree(os.path.join(dst, rel), ignore_errors=True)
+    return result
+
+
+def publish(pkg, public_dir=None, roles=PUBLISH_ROLES, **kw):
+    """Sync the ``roles`` directories of ``pkg`` into ``public_dir``
+       (default ``pkg.public_dir``).  Keyword arguments are passed on to
+       :func:`sync_tree`.
+
+       Roles whose directory does not exist (e.g. the build step was
+       skipped or failed) are left alone, so their published files are
+       kept.
+    """
+    public_dir = public_dir or pkg.public_dir
+    result = SyncResult()
+    for role in roles:
+        if not os.path.isdir(getattr(pkg, role)):
+            continue
+        name = role[len('build_'):] if role.startswith('build_') else role
+        result.extend(sync_tree(getattr(pkg, role), os.path.join(public_dir, name), **kw), name)
+    return result
@@ -0,0 +1,108 @@
+"""
+Split test files into balanced shards for parallel CI workers.
+
+::
+
+    shards = plan_shards([Package('.')], 4)
+    write_shards('build/shards.json', shards)
+
+Test files are found in the ``tests`` and ``tests_js`` roles.  Durations
+from earlier runs are read from JUnit XML files (``pytest --junitxml``)
+below ``build_pytest``; files without a recorded duration are assumed to
+take the median time.  Shards are filled longest-processing-time first.
+"""
+import fnmatch
+import heapq
+import json
+import os
+import statistics
+from xml.etree import ElementTree
+
+#: File name patterns of Python and javascript test files.
+PY_PATTERNS = ('test_*.py', '*_test.py')
+JS_PATTERNS = ('*.test.js', '*.spec.js', 'test_*.js')
+
+
+def _find(top, patterns):
+    if not os.path.isdir(top):
+        return []
+    found = []
+    for dirpath, dirnames, filenames in os.walk(str(top)):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(('.', '__')))
+        for f in sorted(filenames):
+            if any(fnmatch.fnmatch(f, p) for p in patterns):
+                found.append(os.path.join(dirpath, f))
+    return found
+
+
+def find_test_files(pkg):
+    """Absolute paths of the test files of ``pkg``.
+    """
+    return _find(pkg.tests, PY_PATTERNS) + _find(pkg.tests_js, JS_PATTERNS)
+
+
+def _resolve(pkg, testcase, known):
+    """Map a JUnit ``<testcase>`` to one of the ``known`` test files.
+    """
+    fname = testcase.get('file')
+    if fname:
+        path = os.path.normpath(os.path.join(pkg.root, fname))
+        return path if path in known else None
+    parts = (testcase.get('classname') or '').split('.')
+    while parts:
+        path = os.path.join(pkg.root, *parts) + '.py'
+        if path in known:
+            return path
+        parts.pop()
+    return None
+
+
+def read_durations(pkg, files):
+    """Sum the test durations recorded per file in the JUnit XML files
+       below ``build_pytest``.
+    """
+    known = set(files)
+    durations = {}
+    for xml in _find(pkg.build_pytest, ('*.xml',)):
+        try:
+            for _, elem in ElementTree.iterparse(xml):
+                if elem.tag == 'testcase':
+                    path = _resolve(pkg, elem, known)
+                    if path is not None:
+                        durations[path] = durations.get(path, 0.0) + float(elem.get('time') or 0)
+                    elem.clear()
+        except ElementTree.ParseError:
+            continue
+    return durations
+
+
+def plan_shards(packages, n, base=None):
+    """Split the test files of ``packages`` into ``n`` shards with roughly
+       equal estimated duration.
+
+       Returns a list of ``{'files': [...], 'estimate': seconds}``, with
+       file names relative to ``base`` (default: the current directory).
+    """
+    estimates = {}
+    for pkg in packages:
+        files = find_test_files(pkg)
+        durations = read_durations(pkg, files)
+        default = statistics.median(durations.values()) if durations else 1.0
+        for f in files:
+            estimates[f] = durations.get(f, default)
+
+    shards = [{'files': [], 'estimate': 0.0} for _ in range(n)]
+    heap = [(0.0, i) for i in range(n)]
+    for f in sorted(estimates, key=lambda f: (-estimates[f], f)):
+        load, i = heapq.heappop(heap)
+        shards[i]['files'].append(os.path.relpath(f, base or os.curdir).replace(os.sep, '/'))
+        shards[i]['estimate'] = load + estimates[f]
+        heapq.heappush(heap, (shards[i]['estimate'], i))
+    return shards
+
+
+def write_shards(fname, shards):
+    """Write ``shards`` to ``fname`` as JSON.
+    """
+    with open(fname, 'w') as fp:
+        json.dump({'shards': shards}, fp, indent=2)
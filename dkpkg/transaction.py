@@ -0,0 +1,212 @@
+"""
+All-or-nothing creation of missing package directories.
+
+:meth:`dkpkg.directory.DefaultPackage.make_missing` with ``atomic=True``
+plans every directory that needs to be created (including intermediate
+parents), creates them level by level, and removes everything it created
+if any step fails.  A run with nothing to do touches nothing.
+
+The journal ``build_meta/make_missing.json`` is an intent log: the planned
+directories are written to it (after creating ``build_meta`` itself)
+before anything else is created, and it is marked complete at the end.
+If the process dies in between, the next run finds the incomplete journal
+and removes the planned directories that are still empty before starting
+over.
+
+Runs on the same checkout are serialized by ``build_meta/make_missing.lock``
+(created with ``O_EXCL``, holding the owner's pid), so a run never mistakes
+the journal of a run that is still in progress for a crash.  A second run
+raises :class:`FileExistsError` instead; a lock left by a dead process is
+replaced.
+"""
+import errno
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .fs import LOCAL
+
+#: Name of the journal file written to ``build_meta``.
+JOURNAL = 'make_missing.json'
+
+#: Name of the lock file held in ``build_meta`` while a run is active.
+LOCK = 'make_missing.lock'
+
+
+def plan_missing(pkg):
+    """Return every directory that must be created to make the missing
+       directories of ``pkg``, parents before children.
+    """
+    planned = set()
+    for d in pkg.missing_dirs():
+        d = os.path.normpath(d)
+        while d and not pkg.fs.isdir(d) and d not in planned:
+            planned.add(d)
+            parent = os.path.dirname(d)
+            if parent == d:
+                break
+            d = parent
+    return sorted(planned, key=lambda p: (p.count(os.sep), p))
+
+
+def rollback(created, fs=LOCAL):
+    """Remove the directories in ``created`` (deepest first), leaving any
+       directory that has acquired other content in place.
+    """
+    for d in sorted(created, key=lambda p: p.count(os.sep), reverse=True):
+        try:
+            fs.rmdir(d)
+        except OSError:
+            pass
+
+
+def journal_path(pkg):
+    """The path of the journal of ``pkg``.
+    """
+    return os.path.join(pkg.build_meta, JOURNAL)
+
+
+def read_journal(pkg):
+    """The journal of the last run, or ``None``.
+    """
+    try:
+        return json.loads(pkg.fs.read(journal_path(pkg)))
+    except (OSError, ValueError):
+        return None
+
+
+def write_journal(pkg, planned, created=None):
+    """Record the directories a run is about to create (``created`` is
+       ``None``), or has created, in ``build_meta``.
+    """
+    journal = json.dumps({
+        'time': time.time(),
+        'complete': created is not None,
+        'planned': sorted(planned),
+        'created': sorted(created or []),
+    }, indent=2)
+    pkg.fs.write(journal_path(pkg), journal.encode('utf-8'))
+
+
+def _discard_journal(pkg):
+    try:
+        pkg.fs.remove(journal_path(pkg))
+    except OSError:
+        pass
+
+
+def recover(pkg):
+    """Roll back a run that was interrupted (its journal is not marked
+       complete), removing the directories it planned that are still
+       empty.  Returns the planned directories, or ``[]`` if there was
+       nothing to recover.
+    """
+    journal = read_journal(pkg)
+    if journal is None or journal.get('complete'):
+        return []
+    _discard_journal(pkg)
+    rollback(journal['planned'], pkg.fs)
+    return journal['planned']
+
+
+def lock_path(pkg):
+    """The path of the lock file of ``pkg``.
+    """
+    return os.path.join(pkg.build_meta, LOCK)
+
+
+def _lock_is_stale(pkg):
+    """Was the lock taken by a process that no longer exists?
+    """
+    try:
+        pid = int(pkg.fs.read(lock_path(pkg)))
+    except (OSError, ValueError):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+def _acquire(pkg):
+    """Take the lock, replacing it once if its owner has died.
+    """
+    for _ in range(2):
+        try:
+            pkg.fs.create(lock_path(pkg), str(os.getpid()).encode('ascii'))
+            return
+        except FileExistsError:
+            if not _lock_is_stale(pkg):
+                break
+            _release(pkg)
+    raise FileExistsError(errno.EEXIST, 'make_missing is already running', lock_path(pkg))
+
+
+def _release(pkg):
+    try:
+        pkg.fs.remove(lock_path(pkg))
+    except OSError:
+        pass
+
+
+def make_missing_atomic(pkg, workers=None):
+    """Create all missing directories of ``pkg``, or none of them.
+
+       ``build_meta`` (and its missing parents) is created first, to hold
+       the lock and the journal.  While holding the lock, an interrupted
+       earlier run is rolled back (see :func:`recover`), and the whole
+       plan is written to the journal before the other directories are
+       created.  Directories at the same depth are created in parallel
+       using up to ``workers`` threads.  On failure the directories
+       created so far are removed and the original exception is
+       re-raised.  Raises :class:`FileExistsError` if another run holds
+       the lock.  Returns the list of directories created.
+    """
+    journal = read_journal(pkg)
+    plan = plan_missing(pkg)
+    if not plan and (journal is None or journal.get('complete')):
+        return []
+
+    created = []
+
+    def mkdir(d):
+        pkg.fs.mkdir(d)
+        created.append(d)  # list.append is atomic
+
+    meta = os.path.normpath(pkg.build_meta)
+    try:
+        for d in plan:
+            if d == meta or meta.startswith(d + os.sep):
+                try:
+                    mkdir(d)
+                except FileExistsError:
+                    if not pkg.fs.isdir(d):
+                        raise   # created by a concurrent run otherwise
+        _acquire(pkg)
+    except OSError:
+        rollback(created, pkg.fs)
+        raise
+
+    try:
+        recover(pkg)
+        plan = plan_missing(pkg)
+        planned = created + plan
+        write_journal(pkg, planned)
+        levels = {}
+        for d in plan:
+            levels.setdefault(d.count(os.sep), []).append(d)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for depth in sorted(levels):
+                list(pool.map(mkdir, levels[depth]))
+        write_journal(pkg, planned, created)
+    except OSError:
+        _discard_journal(pkg)
+        _release(pkg)
+        rollback(created, pkg.fs)
+        raise
+    _release(pkg)
+    return created
@@ -0,0 +1,177 @@
+"""
+Layout validation rules.
+
+Each rule is a function ``rule(pkg, snapshot)`` that yields
+:class:`Issue` objects.  All rules for a package run against one
+:class:`Snapshot` of the filesystem, so the package is only probed once::
+
+    for issue in validate(Package('.')):
+        print(issue.code, issue.message)
+
+    results = validate_many(packages, workers=8)   # {root: [Issue, ...]}
+
+Register additional rules with the :func:`rule` decorator.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .directory import existing_paths
+from .metadata import parse_setup_py
+
+#: A single validation result.
+Issue = namedtuple('Issue', 'code severity message path')
+
+#: Registered rules, in registration order: code -> function.
+RULES = {}
+
+
+def rule(code):
+    """Register the decorated function as the validation rule ``code``.
+    """
+    def decorator(fn):
+        RULES[code] = fn
+        return fn
+    return decorator
+
+
+def _inside(path, parent):
+    """Is ``path`` equal to, or below, ``parent``?
+    """
+    path = os.path.normpath(path)
+    parent = os.path.normpath(parent)
+    return path == parent or path.startswith(parent + os.sep)
+
+
+class Snapshot:
+    """The parts of the filesystem the rules look at, probed in one batch.
+    """
+
+    def __init__(self, pkg):
+        self.setup_py = os.path.join(pkg.root, 'setup.py')
+        #: source directory -> its ``__init__.py``, for every source root.
+        self.source_inits = {
+            src: os.path.join(src, '__init__.py') for src in pkg.role_paths('source')
+        }
+        self.source_init = self.source_inits[pkg.source]
+        self.app_templates = getattr(pkg, 'app_templates', None)
+        self.existing = existing_paths(
+            list(pkg.expanded_role_dirs.values())
+            + list(self.source_inits.values())
+            + [self.setup_py, self.app_templates],
+            pkg.fs,
+        )
+        self.setup_name = None
+        if self.setup_py in self.existing:
+            text = pkg.fs.read(self.setup_py).decode('utf-8', 'replace')
+            self.setup_name = parse_setup_py(text).get('name')
+
+    def exists(self, path):
+        """Did ``path`` exist when the snapshot was taken?
+        """
+        return path in self.existing
+
+
+@rule('source-init')
+def check_source_init(pkg, snapshot):
+    """The source directory must be a Python package.
+    """
+    for source, init in snapshot.source_inits.items():
+        if snapshot.exists(source) and not snapshot.exists(init):
+            yield Issue('source-init', 'error',
+                        'source directory has no __init__.py', source)
+
+
+@rule('build-in-source')
+def check_build_in_source(pkg, snapshot):
+    """Build output must not be written into a source directory.  Only
+       the outermost misplaced build directory is reported.
+    """
+    reported = []
+    for build in pkg.build_dirs:
+        if any(_inside(build, r) for r in reported):
+            continue
+        for source in pkg.source_dirs:
+            if _inside(build, source):
+                reported.append(build)
+                yield Issue('build-in-source', 'error',
+                            f'build directory is inside {source}', build)
+                break
+
+
+@rule('role-overlap')
+def check_role_overlap(pkg, snapshot):
+    """Tests and docs must not live inside the source directory.
+    """
+    for role in ('tests', 'docs'):
+        for path in pkg.role_paths(role):
+            if any(_inside(path, source) for source in pkg.role_paths('source')):
+                yield Issue('role-overlap', 'warning',
+                            f'{role} directory is inside source', path)
+
+
+@rule('setup-name')
+def check_setup_name(pkg, snapshot):
+    """The distribution name in setup.py must match ``package_name``, and
+       the importable ``name`` must be that name with dashes removed or
+       replaced by underscores.
+    """
+    name = snapshot.setup_name
+    if name is None:
+        return
+    dist = name.replace('_', '-').lower()
+    if dist != pkg.package_name.replace('_', '-').lower():
+        yield Issue('setup-name', 'error',
+                    f'setup.py name {name!r} != package_name {pkg.package_name!r}',
+                    snapshot.setup_py)
+    if pkg.name.lower() not in (dist.replace('-', ''), dist.replace('-', '_')):
+        yield Issue('setup-name', 'error',
+                    f'setup.py name {name!r} does not match name {pkg.name!r}',
+                    snapshot.setup_py)
+
+
+@rule('app-templates')
+def check_app_templates(pkg, snapshot):
+    """An existing ``django_templates`` directory must contain the
+       namespaced ``app_templates`` directory (``templates/<name>``).
+    """
+    app_templates = snapshot.app_templates
+    if app_templates is None or not snapshot.exists(pkg.django_templates):
+        return
+    if not snapshot.exists(app_templates):
+        yield Issue('app-templates', 'warning',
+                    'django_templates has no app_templates directory',
+                    app_templates)
+
+
+def validate(pkg, rules=None):
+    """Run ``rules`` (default: all registered rules) against ``pkg`` and
+       return the list of issues found.
+    """
+    snapshot = Snapshot(pkg)
+    issues = []
+    for code in (rules or RULES):
+        issues.extend(RULES[code](pkg, snapshot))
+    return issues
+
+
+def validate_many(packages, rules=None, workers=None):
+    """Validate many packages in parallel.
+
+       Returns a dict mapping each package root to its list of issues.
+    """
+    packages = list(packages)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda p: validate(p, rules), packages)
+        return {p.root: issues for p, issues in zip(packages, results)}
+
+
+def as_records(results):
+    """Convert the output of :func:`validate_many` to a list of
+       JSON-serializable dicts.
+    """
+    return [
+        dict(issue._asdict(), root=str(root), path=str(issue.path))
+        for root, issues in results.items()
+        for issue in issues
+    ]
@@ -0,0 +1,84 @@
+"""
+One traversal of all package directories, with each entry tagged by role.
+
+::
+
+    for role, entry in pkg.walk(['source_dirs', 'django_dirs'],
+                                prune=lambda role, e: e.name == 'node_modules',
+                                types=['.js', '.css']):
+        print(role, entry.path, entry.stat().st_size)
+
+Roles nest (``build`` contains ``build_docs``, ``source`` contains
+``django_static``...), so walking each role directory separately would
+visit the nested trees more than once.  :func:`walk` instead starts at the
+outermost selected directories, and tags every entry with the innermost
+selected role containing it.  The traversal is depth-first with an
+explicit stack, and only holds the listing of one directory at a time
+(plus the directories still waiting to be visited).  Symlinked
+directories are yielded, but not descended into.
+"""
+import os
+
+
+def _role_tops(pkg, roles):
+    """Return ``({path: role}, [outermost paths])`` for ``roles``.  If two
+       roles have the same path the first one wins.
+    """
+    tagged = {}
+    for role in pkg.expand_roles(roles):
+        for d in pkg.role_paths(role):
+            tagged.setdefault(os.path.normpath(d), role)
+    tops = [
+        d for d in tagged
+        if not any(d.startswith(o.rstrip(os.sep) + os.sep) for o in tagged if o != d)
+    ]
+    return tagged, sorted(tops)
+
+
+def walk(pkg, roles=None, prune=None, types=None):
+    """Yield ``(role, entry)`` for the files and directories below the
+       directories of ``roles`` (role or group names, default: all roles
+       in :attr:`~dkpkg.directory.DefaultPackage.role_dirs`).  ``entry``
+       has the interface of ``os.DirEntry``.
+
+       ``prune(role, entry)`` is called for every directory, and the
+       directory is neither yielded nor entered if it returns true.  If
+       ``types`` (an iterable of filename suffixes, e.g. ``['.js']``) is
+       given only files with these suffixes are yielded.
+    """
+    fs = pkg.fs
+    tagged, tops = _role_tops(pkg, roles or list(pkg.role_dirs))
+    suffixes = tuple(types) if types else None
+
+    for top in tops:
+        if not fs.isdir(top):
+            # a role that is a file (django_models can be models.py)
+            parent, name = os.path.split(top)
+            try:
+                entries = [e for e in fs.scandir(parent) if e.name == name]
+            except OSError:
+                entries = []
+            for entry in entries:
+                if suffixes is None or name.endswith(suffixes):
+                    yield tagged[top], entry
+            continue
+
+        stack = [(tagged[top], top)]
+        while stack:
+            role, path = stack.pop()
+            try:
+                entries = sorted(fs.scandir(path), key=lambda e: e.name)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                entry_role = tagged.get(entry.path, role)
+                if entry.is_dir(follow_symlinks=False):
+                    if prune is not None and prune(entry_role, entry):
+                        continue
+                    subdirs.append((entry_role, entry.path))
+                    if suffixes is None:
+                        yield entry_role, entry
+                elif suffixes is None or entry.name.endswith(suffixes):
+                    yield entry_role, entry
+            stack.extend(reversed(subdirs))
@@ -34,5 +34,10 @@ setuptools.setup(
     classifiers=[line for line in classifiers.split('\n') if line],
     long_description=open('README.rst').read(),
     packages=setuptools.find_packages(),
+    entry_points={
+        'console_scripts': [
+            'dkpkg = dkpkg.cli:main',
+        ],
+    },
     zip_safe=False,
 )
@@ -0,0 +1,31 @@
+from dkfileutils.path import Path
+from dkpkg.affected import PrefixIndex, affected_steps
+from dkpkg.directory import Package
+from yamldirs import create_files
+
+
+def test_affected_roles():
+    with create_files("{a: [], b: []}") as r:
+        r = Path(r)
+        a = Package('a')
+        b = Package('b', source=r / 'b/src')
+        idx = PrefixIndex([a, b])
+        assert idx.lookup(r / 'a/a/models.py') == (a.root, 'source')
+        assert idx.lookup(r / 'a/tests/js/test_x.js') == (a.root, 'tests_js')
+        assert idx.lookup(r / 'b/src/static/x.css') == (b.root, 'django_static')
+        assert idx.lookup(r / 'b/setup.py') == (b.root, 'package')
+        assert idx.lookup(r / 'c/setup.py') is None
+
+        changed = ['a/less/site.less', 'a/docs/index.rst', 'a/build/docs/index.html',
+                   'b/tests/test_b.py', 'README.md']
+        assert idx.affected(changed, base=r) == {
+            a.root: {'source_less', 'docs'},
+            b.root: {'tests'},
+        }
+
+
+def test_affected_steps():
+    with create_files("{a: []}") as r:
+        r = Path(r)
+        steps = affected_steps([Package('a')], ['a/less/site.less', 'a/docs/conf.py'], base=r)
+        assert steps == {Package('a').root: {'css', 'build_docs'}}
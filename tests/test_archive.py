@@ -0,0 +1,107 @@
+import io
+import os
+import json
+import tarfile
+
+import pytest
+from dkfileutils.path import Path
+from dkpkg.archive import extract_file, index_name, read_index
+from dkpkg.directory import Package
+from yamldirs import create_files
+
+FILES = """
+    mypkg:
+        mypkg:
+            - __init__.py: "x = 1"
+        build:
+            pytest:
+                - junit.xml: "<testsuite/>"
+            coverage:
+                - index.html: "cov"
+                - sub:
+                    - a.html: "aaa"
+"""
+
+
+def test_archive_and_restore():
+    with create_files(FILES) as r:
+        r = Path(r)
+        p = Package('mypkg')
+        index = p.archive('cache.tar', ['build', 'build_coverage', 'source_dirs'])
+        assert sorted(index['files']) == [
+            'build/pytest/junit.xml',
+            'build_coverage/index.html',
+            'build_coverage/sub/a.html',
+            'source/__init__.py',
+        ]
+        assert read_index('cache.tar') == index
+
+        out = io.BytesIO()
+        extract_file('cache.tar', 'build_coverage/sub/a.html', out)
+        assert out.getvalue() == b'aaa'
+
+        other = Package('other', build=r / 'elsewhere', source=r / 'src',
+                        build_coverage=r / 'cov')
+        written = other.restore('cache.tar', workers=2)
+        assert len(written) == 4
+        assert (r / 'cov/sub/a.html').read() == 'aaa'
+        assert (r / 'elsewhere/pytest/junit.xml').exists()
+        assert (r / 'src/__init__.py').read() == 'x = 1'
+
+
+def test_archive_compressed():
+    with create_files(FILES) as r:
+        r = Path(r)
+        p = Package('mypkg')
+        p.archive('cache.tgz', ['build_pytest', 'build_coverage'], compression='gz')
+        with pytest.raises(ValueError):
+            extract_file('cache.tgz', 'build_pytest/junit.xml', io.BytesIO())
+
+        other = Package('other', build=r / 'elsewhere')
+        written = other.restore('cache.tgz')
+        assert sorted(written) == sorted([
+            r / 'elsewhere/pytest/junit.xml',
+            r / 'elsewhere/coverage/index.html',
+            r / 'elsewhere/coverage/sub/a.html',
+        ])
+        assert (r / 'elsewhere/pytest/junit.xml').read() == '<testsuite/>'
+
+
+@pytest.mark.parametrize('arcname', [
+    'location/escaped.txt',     # a role outside the package
+    'name/x.txt',               # not a directory
+    'diff/x.txt',               # a method
+    'build/../../escaped.txt',  # leaves the role directory
+    'docs/x.txt',               # not an archived role
+])
+def test_restore_rejects_bad_members(arcname):
+    with create_files(FILES) as r:
+        r = Path(r)
+        with tarfile.open('bad.tgz', 'w:gz') as tar:
+            info = tarfile.TarInfo(arcname)
+            info.size = 3
+            tar.addfile(info, io.BytesIO(b'bad'))
+        roles = {'build': 'build', 'location': '..', 'name': 'mypkg', 'diff': 'x'}
+        with open(index_name('bad.tgz'), 'w') as fp:
+            json.dump({'compression': 'gz', 'roles': roles, 'files': {}}, fp)
+        with pytest.raises(ValueError):
+            Package('mypkg').restore('bad.tgz')
+        assert not (r / 'escaped.txt').exists()
+        assert not (r / 'mypkg/x.txt').exists()
+
+
+@pytest.mark.parametrize('compression', [None, 'gz'])
+def test_restore_keeps_mtime_and_mode(compression):
+    with create_files(FILES) as r:
+        r = Path(r)
+        p = Package('mypkg')
+        script = p.source / '__init__.py'
+        os.chmod(script, 0o755)
+        os.utime(script, ns=(10**15, 10**15 + 123))
+        p.archive('cache.tar', ['source'], compression=compression)
+
+        other = Package('other', source=r / 'src')
+        other.restore('cache.tar')
+        st = os.stat(r / 'src/__init__.py')
+        assert st.st_mtime_ns == 10**15 + 123
+        assert st.st_mode & 0o777 == 0o755
@@ -0,0 +1,37 @@
+import hashlib
+import os
+
+from dkpkg.assets import build_manifest, load_manifest
+from dkpkg.directory import Package
+from yamldirs import create_files
+
+
+def test_build_manifest_incremental():
+    files = """
+        mypkg:
+            mypkg:
+                static:
+                    css:
+                        - site.css: "body {}"
+            js:
+                - app.js: "var x;"
+    """
+    with create_files(files) as r:
+        p = Package('mypkg')
+        m = build_manifest(p, workers=2)
+        digest = hashlib.md5(b'body {}').hexdigest()[:12]
+        assert m['paths']['css/site.css'] == f'css/site.{digest}.css'
+        assert m['paths']['source_js/app.js'].startswith('source_js/app.')
+        assert m['rehashed'] == ['css/site.css', 'source_js/app.js']
+        assert load_manifest(p)['paths'] == m['paths']
+
+        assert build_manifest(p)['rehashed'] == []
+
+        app_js = p.source_js / 'app.js'
+        app_js.write('var y;')
+        st = os.stat(app_js)
+        os.utime(app_js, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        m2 = build_manifest(p)
+        assert m2['rehashed'] == ['source_js/app.js']
+        assert m2['paths']['source_js/app.js'] != m['paths']['source_js/app.js']
+        assert m2['paths']['css/site.css'] == m['paths']['css/site.css']
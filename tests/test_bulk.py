@@ -0,0 +1,21 @@
+from dkpkg.bulk import LayoutTable
+from dkpkg.directory import Package
+
+
+def test_layout_table_matches_package():
+    roots = ['mypkg', 'my-pkg', '/srv/repos/other']
+    table = LayoutTable(roots)
+    assert len(table) == 3
+    for i, root in enumerate(roots):
+        pkg = Package(root)
+        row = table.row(i)
+        for col in LayoutTable.COLUMNS:
+            assert row[col] == getattr(pkg, col), col
+        assert table.package(i).root == pkg.root
+
+
+def test_layout_table_columns_and_rows():
+    table = LayoutTable(['/srv/a', '/srv/b'])
+    assert table['name'] == ['a', 'b']
+    assert [r['build_docs'] for r in table.rows()] == table['build_docs']
+    assert [p.source for p in table.packages()] == table['source']
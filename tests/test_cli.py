@@ -0,0 +1,110 @@
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+
+import pytest
+
+from dkpkg.cli import main, make_server, query, run
+from dkpkg.directory import Package
+from yamldirs import create_files
+
+FILES = """
+    a:
+        a:
+            - models.py: ""
+    b: []
+"""
+
+
+def test_cli_args(capsys):
+    with create_files(FILES) as r:
+        assert main(['a', 'b', '--jobs', '2']) == 0
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [line['root'] for line in lines] == [Package('a').root, Package('b').root]
+        assert lines[0]['is_django']
+        assert lines[0]['django_models'].endswith('models.py')
+        assert not lines[1]['is_django']
+        assert lines[1]['layout']['build_docs'] == Package('b').build_docs
+        assert Package('b').docs in lines[1]['missing_dirs']
+
+
+def test_cli_stdin(monkeypatch, capsys):
+    with create_files(FILES) as r:
+        monkeypatch.setattr('sys.stdin', io.StringIO('a\n\nb\n'))
+        main(['--connect', os.path.join(r, 'no-such-socket')])
+        assert len(capsys.readouterr().out.splitlines()) == 2
+
+
+def test_server():
+    with create_files(FILES) as r:
+        path = os.path.join(tempfile.mkdtemp(), 's.sock')
+        server = make_server(path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            answers = [json.loads(line) for line in query(path, ['a', 'b'])]
+            out = io.StringIO()
+            run(['a', 'b'], out)
+            assert answers == [json.loads(line) for line in out.getvalue().splitlines()]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def test_connect_server_goes_away(monkeypatch, capsys):
+    path = os.path.join(tempfile.mkdtemp(), 's.sock')
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)
+
+    def answer_once():
+        conn, _ = listener.accept()
+        with conn, conn.makefile('rwb') as f:
+            f.readline()
+            f.write(b'{"root": "a"}\n')
+
+    threading.Thread(target=answer_once, daemon=True).start()
+    try:
+        monkeypatch.setattr('sys.stdin', io.StringIO('a\nb\n'))
+        with pytest.raises(OSError):
+            main(['--connect', path])
+        # no fallback output after the partial answer
+        assert capsys.readouterr().out == '{"root": "a"}\n'
+    finally:
+        listener.close()
+
+
+def test_run_streams():
+    """Answers are written before the input is exhausted."""
+    with create_files(FILES) as r:
+        out = io.StringIO()
+
+        def roots():
+            for i in range(10):
+                if i == 8:
+                    assert out.getvalue().count('\n') >= 2
+                yield 'a' if i % 2 else 'b'
+
+        run(roots(), out, jobs=2)
+        assert len(out.getvalue().splitlines()) == 10
+
+
+def test_make_server_keeps_other_files():
+    tmp = tempfile.mkdtemp()
+    fname = os.path.join(tmp, 'somefile')
+    with open(fname, 'w') as fp:
+        fp.write('keep me')
+    with pytest.raises(OSError):
+        make_server(fname)
+    assert os.path.isfile(fname)
+
+    path = os.path.join(tmp, 's.sock')
+    server = make_server(path)
+    try:
+        with pytest.raises(OSError):
+            make_server(path)       # already served
+    finally:
+        server.server_close()
+    make_server(path).server_close()   # stale socket is replaced
@@ -0,0 +1,46 @@
+import json
+
+from dkpkg.covreport import aggregate, write_report
+from dkpkg.directory import Package
+from yamldirs import create_files
+
+FILES = """
+    a:
+        build:
+            coverage:
+                - .coverage: ""
+                - coverage.xml: |
+                    <coverage><packages><package name="a"><classes>
+                      <class filename="a/x.py"><lines>
+                        <line number="1" hits="1"/>
+                        <line number="2" hits="0"/>
+                        <line number="3" hits="1" branch="true" condition-coverage="50% (1/2)"/>
+                      </lines></class>
+                    </classes></package></packages></coverage>
+                - coverage-py39.xml: |
+                    <coverage><packages><package name="a"><classes>
+                      <class filename="a/x.py"><lines>
+                        <line number="2" hits="3"/>
+                        <line number="3" hits="1" branch="true" condition-coverage="100% (2/2)"/>
+                      </lines></class>
+                      <class filename="a/y.py"><lines>
+                        <line number="1" hits="0"/>
+                      </lines></class>
+                    </classes></package></packages></coverage>
+    b: []
+"""
+
+
+def test_aggregate():
+    with create_files(FILES) as r:
+        report = aggregate([Package('a'), Package('b')], workers=2)
+        a = report['packages']['a']
+        assert (a['files'], a['lines_valid'], a['lines_covered']) == (2, 4, 3)
+        assert (a['branches_valid'], a['branches_covered']) == (2, 2)
+        assert a['line_rate'] == 0.75
+        assert len(a['data_files']) == 1
+        assert report['packages']['b']['line_rate'] is None
+        assert report['total']['lines_valid'] == 4
+
+        write_report('summary.json', report)
+        assert json.load(open('summary.json')) == report
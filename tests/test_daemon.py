@@ -0,0 +1,83 @@
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from dkpkg.cli import make_server
+from dkfileutils.path import Path
+from dkpkg.daemon import LayoutCache, RemotePackage, connect
+from dkpkg.directory import Package
+from yamldirs import create_files
+
+
+@pytest.mark.parametrize('use_inotify', [False, True])
+def test_layout_cache_invalidation(use_inotify):
+    with create_files("mypkg: [mypkg: []]") as r:
+        cache = LayoutCache(use_inotify=use_inotify)
+        try:
+            first = cache.get('mypkg')
+            assert not first['is_django']
+            assert cache.get('mypkg') is first
+
+            os.mkdir(os.path.join('mypkg', 'mypkg', 'static'))
+            for _ in range(100):
+                if cache.get('mypkg') is not first:
+                    break
+                time.sleep(0.01)
+            assert cache.get('mypkg')['is_django']
+        finally:
+            cache.close()
+
+
+def test_layout_cache_close():
+    with create_files("mypkg: [mypkg: []]") as r:
+        cache = LayoutCache(use_inotify=True)
+        inotify = cache.inotify
+        cache.get('mypkg')
+        assert inotify.keys
+        cache.invalidate(os.path.abspath('mypkg'))
+        assert not inotify.keys         # watches are dropped with the answer
+
+        first = cache.get('mypkg')
+        cache.close()
+        assert cache.inotify is None
+        assert not inotify._thread.is_alive()
+        assert inotify.fd == -1
+        cache.close()                   # closing twice is harmless
+
+        # without inotify the cache falls back to modification times
+        assert cache.get('mypkg') == first
+        os.mkdir(os.path.join('mypkg', 'mypkg', 'static'))
+        assert cache.get('mypkg')['is_django']
+
+
+def test_connect():
+    with create_files("mypkg: [mypkg: [models.py: '']]") as r:
+        path = os.path.join(tempfile.mkdtemp(), 'd.sock')
+
+        local = connect('mypkg', path)
+        assert isinstance(local, Package)
+
+        cache = LayoutCache()
+        server = make_server(path, cache.answer_line)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            remote = connect('mypkg', path)
+            assert isinstance(remote, RemotePackage)
+            assert remote.is_django()
+            assert remote.django_models == local.django_models
+            assert remote.build_docs == local.build_docs
+            assert sorted(remote.missing_dirs()) == sorted(local.missing_dirs())
+            assert isinstance(remote.build, Path)
+            assert remote.build / 'x' == local.build / 'x'
+            assert isinstance(remote.django_models, Path)
+            assert all(isinstance(d, Path) for d in remote.missing_dirs())
+            assert remote.name == local.name
+            with pytest.raises(AttributeError):
+                remote.no_such_attribute
+            remote.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+            cache.close()
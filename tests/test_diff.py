@@ -0,0 +1,145 @@
+import os
+
+import pytest
+
+from dkfileutils.path import Path
+from dkpkg.diff import apply_moves
+from dkpkg.directory import Package
+from dkpkg.fs import MemoryBackend
+from yamldirs import create_files
+
+
+def test_diff_identical_layouts():
+    with create_files("mypkg: []") as r:
+        d = Package('mypkg').diff(Package('mypkg'))
+        assert not d
+        assert d.moved_roles == {}
+        assert d.plan_moves() == []
+
+
+def test_diff_is_relative_to_root():
+    files = """
+        a:
+            mypkg:
+                - docs: []
+        b:
+            mypkg: []
+    """
+    with create_files(files) as r:
+        r = Path(r)
+        d = Package(r / 'a/mypkg').diff(Package(r / 'b/mypkg'))
+        assert d.moved_roles == {}
+        assert d.only_in_a == ['docs']
+        assert d.only_in_b == []
+
+
+def test_diff_plans_minimal_moves():
+    files = """
+        mypkg:
+            build:
+                - coverage: []
+                - docs: []
+            mypkg:
+                - static: []
+    """
+    with create_files(files) as r:
+        r = Path(r)
+        a = Package('mypkg')
+        b = Package('mypkg', build=r / 'mypkg/out', source=r / 'mypkg/src')
+        d = a.diff(b)
+        assert d.moved_roles['build'] == ('build', 'out')
+        assert d.moved_roles['build_docs'] == (os.path.join('build', 'docs'),
+                                               os.path.join('out', 'docs'))
+        moves = d.plan_moves()
+        assert sorted(moves) == sorted([
+            (a.build, b.build),
+            (a.source, b.source),
+        ])
+
+        assert apply_moves(moves, dry_run=True) == moves
+        assert a.build.exists()
+
+        apply_moves(moves)
+        assert not a.build.exists()
+        assert b.build_coverage.exists()
+        assert b.django_static.exists()
+        assert not b.diff(Package('mypkg', build=b.build, source=b.source))
+
+
+def test_plan_moves_nested_role_moving_independently():
+    files = """
+        mypkg:
+            build:
+                - docs: []
+    """
+    with create_files(files) as r:
+        r = Path(r)
+        a = Package('mypkg')
+        b = Package('mypkg', build=r / 'mypkg/out', build_docs=r / 'mypkg/html')
+        moves = a.diff(b).plan_moves()
+        assert moves == [
+            (a.build, b.build),
+            (os.path.join(b.build, 'docs'), b.build_docs),
+        ]
+        apply_moves(moves, workers=2)
+        assert b.build.exists()
+        assert b.build_docs.exists()
+        assert not (b.build / 'docs').exists()
+
+
+def test_plan_moves_stays_inside_a():
+    files = """
+        a:
+            mypkg:
+                - build: []
+        b:
+            mypkg: []
+    """
+    with create_files(files) as r:
+        r = Path(r)
+        a = Package(r / 'a/mypkg')
+        b = Package(r / 'b/mypkg', build=r / 'b/mypkg/out')
+        assert a.diff(b).plan_moves() == [(a.build, r / 'a/mypkg/out')]
+
+
+def test_move_conflicts():
+    files = """
+        mypkg:
+            - build:
+                - docs: []
+            - out: []
+    """
+    with create_files(files) as r:
+        r = Path(r)
+        a = Package('mypkg')
+        d = a.diff(Package('mypkg', build=r / 'mypkg/out'))
+        assert d.conflicts() == [(a.build, r / 'mypkg/out')]
+        with pytest.raises(FileExistsError):
+            apply_moves(d.plan_moves(), dry_run=True)
+        with pytest.raises(FileExistsError):
+            apply_moves(d.plan_moves())
+        assert (a.build / 'docs').isdir()
+
+
+def test_apply_moves_memory_backend():
+    fs = MemoryBackend()
+    fs.write('/src/mypkg/build/docs/index.html', b'x')
+    a = Package('/src/mypkg', fs=fs)
+    d = a.diff(Package('/src/mypkg', build=Path('/src/mypkg/out')))
+    assert d.conflicts() == []
+    apply_moves(d.plan_moves(), fs=a.fs)
+    assert fs.read('/src/mypkg/out/docs/index.html') == b'x'
+    assert not fs.exists('/src/mypkg/build')
+    assert [e.name for e in fs.scandir('/src/mypkg/out')] == ['docs']
+
+
+def test_diff_extra_dirs():
+    fs = MemoryBackend()
+    fs.makedirs('/a/mypkg/plugins')
+    fs.makedirs('/b/mypkg/contrib/plugins')
+    a = Package('/a/mypkg', fs=fs, extra_dirs={'source': ['/a/mypkg/plugins']})
+    b = Package('/b/mypkg', fs=fs, extra_dirs={'source': ['/b/mypkg/contrib/plugins']})
+    d = a.diff(b)
+    assert d.moved_roles == {'source:1': ('plugins', 'contrib/plugins')}
+    assert d.plan_moves() == [('/a/mypkg/plugins', '/a/mypkg/contrib/plugins')]
+    assert 'source:1' in a.diff(Package('/b/mypkg', fs=fs)).only_in_a
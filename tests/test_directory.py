@@ -262,3 +262,34 @@ def test_package_default():
         assert p.django_templates.exists()
         assert p.django_static.exists()
         assert p.tests.exists()
+
+
+def test_multi_root_package():
+    files = """
+        mono:
+            - core:
+                - __init__.py: ""
+            - plugins:
+                - templates: []
+            - tests: []
+    """
+    with create_files(files) as r:
+        r = Path(r)
+        p = Package('mono', source=r / 'mono/core',
+                    extra_dirs={'source': [r / 'mono/plugins'],
+                                'tests': ['mono/plugins_tests']})
+        assert p.role_paths('source') == [r / 'mono/core', r / 'mono/plugins']
+        assert p.role_paths('tests') == [r / 'mono/tests', r / 'mono/plugins_tests']
+        assert p.source_dirs[:2] == [r / 'mono/core', r / 'mono/plugins']
+        assert r / 'mono/plugins/static' in p.django_dirs
+        assert p.is_django()
+
+        missing = p.missing_dirs()
+        assert r / 'mono/plugins_tests' in missing
+        assert r / 'mono/plugins/static' in missing
+        assert r / 'mono/plugins/templates' not in missing
+        assert r / 'mono/core' not in missing
+
+        p.make_missing()
+        assert p.missing_dirs() == []
+        assert (r / 'mono/plugins_tests').isdir()
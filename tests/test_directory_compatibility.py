@@ -1,7 +1,10 @@
 """Behavior tests for package layout overrides and compatibility aliases."""
 
+import threading
+
+import pytest
 from dkfileutils.path import Path
-from dkpkg.directory import Package
+from dkpkg.directory import ROLE_DEPENDENTS, ROLES, Package, dependent_roles
 from yamldirs import create_files
 
 
@@ -78,3 +81,174 @@ def test_dkcode_compatibility_aliases_read_and_update_canonical_paths():
             setattr(package, alias, value)
             assert getattr(package, alias) == value
             assert getattr(package, canonical) == value
+
+
+def test_with_overrides_rederives_dependent_roles_only():
+    """Derived layouts recompute only what depends on the changed roles."""
+    with create_files("mypkg: []") as location:
+        location = Path(location)
+        base = Package('mypkg', build_docs=location / 'html')
+
+        job = base.with_overrides(build=location / 'job-build')
+
+        assert job.build == location / 'job-build'
+        assert job.build_coverage == location / 'job-build/coverage'
+        assert job.build_pytest == location / 'job-build/pytest'
+        assert job.build_docs == location / 'html'
+        assert job.source is base.source
+        assert job.django_static is base.django_static
+        assert base.build == location / 'mypkg/build'
+
+        src = base.with_overrides(source=location / 'src', name='other')
+        assert src.source == location / 'src'
+        assert src.django_templates == location / 'src/templates'
+        assert src.django_models_py == location / 'src/models.py'
+        assert src.app_templates == location / 'src/templates/other'
+        assert src.docs is base.docs
+
+        renamed = base.with_overrides(name='other')
+        assert renamed.source == location / 'mypkg/other'
+        assert renamed.django_static == location / 'mypkg/other/static'
+        assert renamed.build is base.build
+
+
+def test_with_overrides_matches_constructor():
+    """Overriding a role in a copy gives the same layout as passing it to
+       the constructor.
+    """
+    with create_files("mypkg: []") as location:
+        location = Path(location)
+        base = Package('mypkg')
+        for kw in [{'source': location / 'src'},
+                   {'build': location / 'out'},
+                   {'source': location / 'src', 'django_static': location / 'static'}]:
+            derived = base.with_overrides(**kw)
+            built = Package('mypkg', **kw)
+            for role in ROLES:
+                assert getattr(derived, role) == getattr(built, role), (kw, role)
+
+        assert base.with_overrides(build_dir=location / 'out').build == location / 'out'
+        assert 'build_dir' not in vars(base.with_overrides(build_dir=location / 'out'))
+        with pytest.raises(TypeError):
+            base.with_overrides(buld=location / 'out')
+
+
+def test_assigning_a_role_rederives_its_dependents():
+    """Mutating a role keeps derived roles in sync, and notifies listeners."""
+    with create_files("mypkg: []") as location:
+        location = Path(location)
+        package = Package('mypkg', build_meta=location / 'meta')
+        changes = []
+        package.subscribe(lambda pkg, role, old, new: changes.append(role))
+
+        package.build_dir = location / 'out'
+
+        assert package.build_coverage == location / 'out/coverage'
+        assert package.build_pytest == location / 'out/pytest'
+        assert package.build_meta == location / 'meta'
+        assert changes == ['build', 'build_coverage', 'build_docs',
+                           'build_lintscore', 'build_pytest']
+
+        # explicitly assigned roles are no longer derived
+        package.build_pytest = location / 'pytest'
+        package.build = location / 'out2'
+        assert package.build_pytest == location / 'pytest'
+        assert package.build_docs == location / 'out2/docs'
+
+        del changes[:]
+        package.source = location / 'src'
+        assert package.django_templates == location / 'src/templates'
+        assert package.app_templates == location / 'src/templates/mypkg'
+        assert changes[-1] == 'app_templates'
+
+
+def test_assigning_a_str_role():
+    """Plain strings are accepted, and converted to paths."""
+    with create_files("mypkg: []") as location:
+        location = Path(location)
+        package = Package('mypkg')
+        package.build_dir = str(location / 'out')
+        assert isinstance(package.build, Path)
+        assert package.build_coverage == location / 'out/coverage'
+        package.update(source=str(location / 'src'), name='other')
+        assert package.app_templates == location / 'src/templates/other'
+
+
+def test_dependent_roles():
+    assert ROLE_DEPENDENTS['build_docs'] == []
+    assert dependent_roles('source') == [
+        'django_templates', 'django_static', 'django_models_dir',
+        'django_models_py', 'app_templates',
+    ]
+    assert dependent_roles('package_name')[:2] == ['name', 'source']
+
+
+def test_snapshots_are_consistent_and_read_only():
+    """Snapshots do not see later updates, and cannot be modified."""
+    with create_files("mypkg: []") as location:
+        location = Path(location)
+        package = Package('mypkg')
+        snap = package.snapshot()
+
+        changes = package.update(build_dir=location / 'out', docs=location / 'guide')
+        assert ('build', snap.build, location / 'out') in changes
+        assert package.revision == 1
+        assert package.build_docs == location / 'out/docs'
+        assert snap.build_docs == location / 'mypkg/build/docs'
+        assert snap.revision == 0
+
+        with pytest.raises(AttributeError):
+            snap.build = location / 'x'
+        with pytest.raises(AttributeError):
+            snap.coverage_dir = location / 'x'
+        assert snap.with_overrides(build=location / 'x').build == location / 'x'
+
+
+def test_snapshot_listeners_and_non_role_attributes():
+    """Snapshots have their own listeners, and only roles are versioned."""
+    with create_files("mypkg: []") as location:
+        location = Path(location)
+        package = Package('mypkg')
+        snap = package.snapshot()
+        seen = []
+        snap.subscribe(lambda pkg, role, old, new: seen.append(role))
+        package.build = location / 'out'
+        assert seen == []
+
+        package.subscribe(lambda pkg, role, old, new: seen.append(role))
+        revision = package.revision
+        package.extra_dirs = {'source': [location / 'src2']}
+        assert package.revision == revision
+        assert seen == []
+        assert package.extra_dirs == {'source': [location / 'src2']}
+
+
+def test_concurrent_readers_and_writers():
+    """Readers never observe a half-applied update."""
+    with create_files("mypkg: []") as location:
+        location = Path(location)
+        package = Package('mypkg')
+        builds = [location / f'build{i}' for i in range(2)]
+        errors = []
+
+        def writer():
+            for i in range(300):
+                package.build = builds[i % 2]
+
+        def reader():
+            for _ in range(300):
+                try:
+                    snap = package.snapshot()
+                    assert snap.build_pytest == snap.build / 'pytest'
+                    repr(package)
+                    package.missing_dirs()
+                except Exception as e:  # pragma: nocover
+                    errors.append(e)
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert errors == []
+        assert package.revision == 300
@@ -0,0 +1,53 @@
+import os
+
+from dkpkg.directory import Package
+from dkpkg.docbuild import docs_changes, save_docs_manifest
+from yamldirs import create_files
+
+FILES = """
+    mypkg:
+        docs:
+            - conf.py: ""
+            - index.rst: "Hello"
+            - api.rst: |
+                .. automodule:: mypkg.core
+                   :members:
+            - classes.rst: |
+                .. autoclass:: mypkg.util.Helper
+        mypkg:
+            - __init__.py: ""
+            - core.py: "x = 1"
+            - util.py: "y = 1"
+"""
+
+
+def touch(fname, text):
+    with open(fname, 'w') as fp:
+        fp.write(text)
+    st = os.stat(fname)
+    os.utime(fname, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_docs_changes():
+    with create_files(FILES) as r:
+        p = Package('mypkg')
+        first = docs_changes(p)
+        assert first.full_rebuild
+
+        save_docs_manifest(p)
+        assert not docs_changes(p)
+
+        touch(p.source / 'core.py', 'x = 2')
+        touch(p.docs / 'index.rst', 'Hello world')
+        changes = docs_changes(p)
+        assert not changes.full_rebuild
+        assert changes.modules == ['mypkg.core']
+        assert changes.docs == ['index.rst']
+        assert changes.stale_pages == ['api.rst', 'index.rst']
+
+        save_docs_manifest(p)
+        touch(p.source / 'util.py', 'y = 2')
+        assert docs_changes(p).stale_pages == ['classes.rst']
+
+        touch(p.docs / 'conf.py', 'project = "x"')
+        assert docs_changes(p).full_rebuild
@@ -0,0 +1,53 @@
+from dkpkg.directory import Package
+from dkpkg.dupes import PARTIAL_SIZE, find_duplicates
+from dkpkg.fs import MemoryBackend
+
+
+def _packages():
+    big = b'x' * (PARTIAL_SIZE + 10)
+    fs = MemoryBackend()
+    fs.write('/src/a/js/jquery.js', b'jquery')
+    fs.write('/src/b/b/static/vendor/jquery.js', b'jquery')
+    fs.write('/src/b/js/jquery.min.js', b'jquery')
+    fs.write('/src/a/less/same-size.less', b'jqueri')
+    fs.write('/src/a/a/static/big.bin', big + b'1')
+    fs.write('/src/b/b/static/big.bin', big + b'1')
+    fs.write('/src/b/styles/big.css', big + b'2')      # same head, different tail
+    fs.write('/src/a/a/static/empty.txt', b'')
+    fs.write('/src/b/b/static/empty.txt', b'')
+    fs.write('/src/b/docs/jquery.js', b'jquery')       # not a searched role
+    return [Package('/src/a', fs=fs), Package('/src/b', fs=fs)]
+
+
+def test_find_duplicates():
+    report = find_duplicates(_packages(), workers=4)
+    assert len(report.clusters) == 2
+    big, jquery = report.clusters
+    assert big.size == PARTIAL_SIZE + 11
+    assert [path for _, _, path in big.files] == ['/src/a/a/static/big.bin', '/src/b/b/static/big.bin']
+    assert jquery.files == [
+        ('a', 'source_js', '/src/a/js/jquery.js'),
+        ('b', 'django_static', '/src/b/b/static/vendor/jquery.js'),
+        ('b', 'source_js', '/src/b/js/jquery.min.js'),
+    ]
+    assert jquery.wasted == 12
+    assert report.wasted == big.wasted + 12
+
+
+def test_report_groups():
+    report = find_duplicates(_packages())
+    by_role = report.by_role()
+    assert set(by_role) == {'source_js', 'django_static'}
+    assert len(by_role['django_static']) == 2
+    by_package = report.by_package()
+    assert len(by_package['a']) == len(by_package['b']) == 2
+    records = report.as_records()
+    assert records[0]['wasted'] == PARTIAL_SIZE + 11
+    assert records[1]['files'][0] == {'package': 'a', 'role': 'source_js', 'path': '/src/a/js/jquery.js'}
+
+
+def test_roles_and_min_size():
+    report = find_duplicates(_packages(), roles=['source_js'], min_size=0)
+    [cluster] = report.clusters
+    assert cluster.roles == ['source_js']
+    assert cluster.packages == ['a', 'b']
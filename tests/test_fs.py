@@ -0,0 +1,96 @@
+import json
+
+import pytest
+from dkpkg.directory import Package
+from dkpkg.fs import LOCAL, MemoryBackend
+from dkpkg.transaction import JOURNAL
+
+
+def test_default_backend():
+    p = Package('/src/mypkg')
+    assert p.fs is LOCAL
+    assert 'fs' not in repr(p)
+
+
+def test_memory_is_django():
+    fs = MemoryBackend()
+    fs.makedirs('/src/mypkg/mypkg')
+    p = Package('/src/mypkg', fs=fs)
+    assert not p.is_django()
+    assert p.django_models is None
+
+    fs.write('/src/mypkg/mypkg/models.py', b'')
+    assert p.is_django()
+    assert p.django_models == p.django_models_py
+
+
+def test_memory_missing_dirs():
+    fs = MemoryBackend()
+    fs.makedirs('/src/mypkg/docs')
+    p = Package('/src/mypkg', fs=fs)
+    missing = p.missing_dirs()
+    assert p.docs not in missing
+    assert p.build_meta in missing
+
+    p.make_missing()
+    assert p.missing_dirs() == []
+    assert fs.isdir('/src/mypkg/build/meta')
+
+
+def test_memory_make_missing_atomic():
+    fs = MemoryBackend()
+    fs.makedirs('/src/mypkg')
+    p = Package('/src/mypkg', fs=fs)
+    created = p.make_missing(atomic=True, workers=4)
+    assert p.missing_dirs() == []
+    journal = json.loads(fs.read(p.build_meta / JOURNAL))
+    assert sorted(created) == journal['created']
+
+
+def test_memory_make_missing_atomic_rollback():
+    fs = MemoryBackend()
+    fs.write('/src/mypkg/build', b'a file, not a directory')
+    p = Package('/src/mypkg', fs=fs)
+    with pytest.raises(OSError):
+        p.make_missing(atomic=True)
+    assert not fs.isdir('/src/mypkg/docs')
+    assert fs.isfile('/src/mypkg/build')
+
+
+def test_memory_scandir():
+    fs = MemoryBackend()
+    fs.write('/a/b/c.txt', b'hello')
+    fs.makedirs('/a/d')
+    entries = list(fs.scandir('/a'))
+    assert [e.name for e in entries] == ['b', 'd']
+    assert all(e.is_dir() for e in entries)
+    [c] = fs.scandir('/a/b')
+    assert c.is_file() and c.stat().st_size == 5
+    assert fs.exists_many(['/a/b', '/a/x', '/a/b/c.txt']) == {'/a/b', '/a/b/c.txt'}
+
+    with pytest.raises(OSError):
+        fs.rmdir('/a/b')
+    fs.rmdir('/a/d')
+    assert [e.name for e in fs.scandir('/a')] == ['b']
+
+
+def test_head_and_chunks(tmp_path):
+    fname = str(tmp_path / 'f.bin')
+    LOCAL.write(fname, b'abcdefg')
+    assert LOCAL.head(fname, 3) == b'abc'
+    assert b''.join(LOCAL.chunks(fname, 2)) == b'abcdefg'
+
+    fs = MemoryBackend()
+    fs.write('/f.bin', b'abcdefg')
+    assert fs.head('/f.bin', 3) == b'abc'
+    assert list(fs.chunks('/f.bin', 4)) == [b'abcd', b'efg']
+
+
+def test_memory_remove():
+    fs = MemoryBackend()
+    fs.write('/a/f.txt', b'x')
+    fs.remove('/a/f.txt')
+    assert not fs.exists('/a/f.txt')
+    fs.rmdir('/a')
+    with pytest.raises(FileNotFoundError):
+        fs.remove('/a/f.txt')
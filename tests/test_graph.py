@@ -0,0 +1,67 @@
+import pytest
+from dkpkg.directory import Package
+from dkpkg.graph import CycleError, DependencyGraph, read_requirements
+from yamldirs import create_files
+
+FILES = '''
+    dkfileutils:
+        - setup.py: |
+            from setuptools import setup
+            setup(name='dkfileutils')
+    yamldirs:
+        - setup.py: |
+            from setuptools import setup
+            setup(name='yamldirs', install_requires=['PyYAML'])
+    dkpkg:
+        - setup.py: |
+            from setuptools import setup
+            setup(name='dkpkg', install_requires=['dkfileutils'])
+        - requirements.txt: |
+            pytest-cov==7.1.0
+            PyYAML==6.0.1 ; python_version < '3.12'
+            # a comment
+            -e ../yamldirs
+            -e ../missing
+    dkapp:
+        - requirements.txt: |
+            -e git+https://example.com/dkpkg.git#egg=dkpkg
+'''
+
+
+def test_read_requirements():
+    with create_files(FILES) as r:
+        names, paths = read_requirements('dkpkg/requirements.txt')
+        assert names == ['pytest-cov', 'pyyaml']
+        assert paths == [Package('yamldirs').root, Package('missing').root]
+
+
+def test_dependency_graph():
+    with create_files(FILES) as r:
+        pkgs = {name: Package(name) for name in ['dkfileutils', 'yamldirs', 'dkpkg', 'dkapp']}
+        root = {name: p.root for name, p in pkgs.items()}
+        g = DependencyGraph(pkgs.values())
+
+        assert g.dependencies(root['dkpkg']) == {root['dkfileutils'], root['yamldirs']}
+        assert g.dependencies(root['dkapp']) == {root['dkpkg']}
+        assert g.dependents(root['dkfileutils']) == {root['dkpkg']}
+        assert g.dependents(root['dkfileutils'], transitive=True) == {root['dkpkg'], root['dkapp']}
+        assert g.build_levels() == [
+            sorted([root['dkfileutils'], root['yamldirs']]),
+            [root['dkpkg']],
+            [root['dkapp']],
+        ]
+        order = g.topological_order()
+        assert order.index(root['dkfileutils']) < order.index(root['dkpkg']) < order.index(root['dkapp'])
+
+
+def test_dependency_cycle():
+    files = '''
+        a:
+            - requirements.txt: "-e ../b"
+        b:
+            - requirements.txt: "-e ../a"
+    '''
+    with create_files(files) as r:
+        g = DependencyGraph([Package('a'), Package('b')])
+        with pytest.raises(CycleError):
+            g.build_levels()
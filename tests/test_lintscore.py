@@ -0,0 +1,40 @@
+from dkpkg.directory import Package
+from dkpkg.lintscore import LintHistory, latest_scores, parse_pylint
+from yamldirs import create_files
+
+OUTPUT = """\
+************* Module mypkg.a
+mypkg/a.py:1:0: C0114: Missing module docstring (missing-module-docstring)
+mypkg/a.py:3:4: W0612: Unused variable 'x' (unused-variable)
+mypkg/b.py:10:0: C0301: Line too long (120/100) (line-too-long)
+
+-----------------------------------
+Your code has been rated at 9.25/10
+"""
+
+
+def test_parse_pylint():
+    score, counts = parse_pylint(OUTPUT)
+    assert score == 9.25
+    assert counts == {'mypkg/a.py': 2, 'mypkg/b.py': 1}
+
+
+def test_lint_history():
+    with create_files("{mypkg: [], other: []}") as r:
+        p = Package('mypkg')
+        history = LintHistory(p.build_lintscore)
+        assert history.last() is None
+        assert history.regressions() == {}
+
+        history.ingest(9.0, {'a.py': 2, 'b.py': 1}, timestamp=1)
+        history.ingest(8.5, {'a.py': 1, 'b.py': 3, 'c.py': 1}, timestamp=2)
+        history.ingest(8.5, {'a.py': 1, 'b.py': 3, 'c.py': 1}, timestamp=3)
+        assert history.last() == {'time': 3, 'score': 8.5, 'changed': {}}
+        assert [r['time'] for r in history.records()] == [1, 2, 3]
+
+        history.ingest(8.0, {'b.py': 4, 'c.py': 1}, timestamp=4)
+        assert history.regressions() == {'b.py': [3, 4]}
+        assert history.last()['changed']['a.py'] == [1, 0]
+        assert history.counts() == {'b.py': 4, 'c.py': 1}
+
+        assert latest_scores([p, Package('other')], workers=2) == {'mypkg': 8.0, 'other': None}
@@ -0,0 +1,91 @@
+import os
+
+from dkpkg.directory import Package
+from dkpkg.metadata import Metadata, read_setup_py
+from yamldirs import create_files
+
+
+def test_read_setup_py_without_executing():
+    files = '''
+        setup.py: |
+            """mypkg - a package
+            """
+            import sys
+            import setuptools
+            version = '1.2.3'
+            sys.exit("setup.py was executed")
+            setuptools.setup(
+                name='mypkg',
+                version=version,
+                description=__doc__.strip(),
+                install_requires=['dkfileutils', 'PyYAML>=6'],
+                long_description=open('README.rst').read(),
+            )
+    '''
+    with create_files(files) as r:
+        kw = read_setup_py('setup.py')
+        assert kw['name'] == 'mypkg'
+        assert kw['version'] == '1.2.3'
+        assert kw['description'] == 'mypkg - a package'
+        assert kw['install_requires'] == ['dkfileutils', 'PyYAML>=6']
+        assert kw['long_description'] is None
+
+
+def test_metadata_precedence():
+    files = '''
+        mypkg:
+            - dkbuild.yml: |
+                package:
+                    name: mypkg
+                    description: from dkbuild
+            - setup.cfg: |
+                [metadata]
+                version = attr: mypkg.__version__
+                description = from setup.cfg
+
+                [options]
+                install_requires =
+                    requests
+                    six
+            - mypkg:
+                - __init__.py: |
+                    __version__ = '3.0.0'
+    '''
+    with create_files(files) as r:
+        md = Package('mypkg').metadata
+        assert md == Metadata('mypkg', '3.0.0', 'from setup.cfg', ['requests', 'six'])
+
+
+def test_pyproject_toml():
+    files = '''
+        mypkg:
+            - setup.py: |
+                from setuptools import setup
+                setup(name='mypkg', version='1.0')
+            - pyproject.toml: |
+                [project]
+                name = "my-pkg"
+                version = "2.0"
+                dependencies = ["attrs"]
+    '''
+    with create_files(files) as r:
+        md = Package('mypkg').metadata
+        assert (md.name, md.version, md.dependencies) == ('my-pkg', '2.0', ['attrs'])
+
+
+def test_metadata_cached_by_mtime():
+    files = '''
+        mypkg:
+            - setup.py: |
+                from setuptools import setup
+                setup(name='mypkg', version='1.0')
+    '''
+    with create_files(files) as r:
+        p = Package('mypkg')
+        md = p.metadata
+        assert p.metadata is md
+        setup_py = p.root / 'setup.py'
+        setup_py.write("from setuptools import setup\nsetup(name='mypkg', version='1.1')\n")
+        st = os.stat(setup_py)
+        os.utime(setup_py, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert p.metadata.version == '1.1'
@@ -0,0 +1,81 @@
+import os
+
+from dkpkg.directory import Package
+from dkpkg.publish import sync_tree
+from yamldirs import create_files
+
+
+def test_publish_to():
+    files = """
+        mypkg:
+            build:
+                docs:
+                    - index.html: "index"
+                    - api:
+                        - mod.html: "mod"
+                coverage:
+                    - index.html: "cov"
+    """
+    with create_files(files) as r:
+        p = Package('mypkg')
+        res = p.publish_to()
+        assert sorted(res.copied + res.cloned) == sorted([
+            os.path.join('docs', 'index.html'),
+            os.path.join('docs', 'api', 'mod.html'),
+            os.path.join('coverage', 'index.html'),
+        ])
+        assert (p.public_dir / 'docs/api/mod.html').read() == 'mod'
+
+        res = p.publish_to()
+        assert len(res.unchanged) == 3
+        assert res.copied == res.cloned == res.deleted == []
+
+        (p.build_docs / 'api').rmtree()
+        res = p.publish_to(roles=['build_docs'])
+        assert res.deleted == [os.path.join('docs', 'api', 'mod.html')]
+        assert not (p.public_dir / 'docs/api').exists()
+        assert (p.public_dir / 'coverage/index.html').exists()
+
+        # a missing build directory does not unpublish the role
+        p.build_coverage.rmtree()
+        res = p.publish_to()
+        assert res.deleted == []
+        assert (p.public_dir / 'coverage/index.html').exists()
+
+
+def test_sync_tree_copy_and_checksum():
+    files = """
+        src:
+            - a.txt: "hello"
+        dst:
+            - a.txt: "hello"
+            - stale.txt: "x"
+    """
+    with create_files(files) as r:
+        os.utime('dst/a.txt', (0, 0))
+        res = sync_tree('src', 'dst', checksum=True, link=False, delete=False)
+        assert res.unchanged == ['a.txt']
+        assert os.path.exists('dst/stale.txt')
+
+        with open('src/a.txt', 'w') as fp:
+            fp.write('world')
+        res = sync_tree('src', 'dst', link=False)
+        assert res.copied + res.cloned == ['a.txt']
+        assert res.deleted == ['stale.txt']
+        assert open('dst/a.txt').read() == 'world'
+        assert os.stat('dst/a.txt').st_ino != os.stat('src/a.txt').st_ino
+
+
+def test_sync_tree_link():
+    files = """
+        src:
+            - a.txt: "hello"
+    """
+    with create_files(files) as r:
+        res = sync_tree('src', 'copy')
+        assert res.linked == []
+        assert os.stat('copy/a.txt').st_ino != os.stat('src/a.txt').st_ino
+
+        res = sync_tree('src', 'linked', link=True)
+        assert res.linked == ['a.txt']
+        assert os.stat('linked/a.txt').st_ino == os.stat('src/a.txt').st_ino
@@ -0,0 +1,48 @@
+import json
+
+from dkpkg.directory import Package
+from dkpkg.shard import find_test_files, plan_shards, write_shards
+from yamldirs import create_files
+
+FILES = """
+    mypkg:
+        tests:
+            - test_a.py: ""
+            - test_b.py: ""
+            - test_c.py: ""
+            - sub:
+                - d_test.py: ""
+            - helpers.py: ""
+            - js:
+                - widget.test.js: ""
+        build:
+            pytest:
+                - junit.xml: |
+                    <testsuites><testsuite>
+                      <testcase classname="tests.test_a" name="t1" time="5.0"/>
+                      <testcase classname="tests.test_a.TestX" name="t2" time="3.0"/>
+                      <testcase classname="tests.test_b" name="t1" time="2.0"/>
+                      <testcase file="tests/sub/d_test.py" classname="x" name="t" time="6.0"/>
+                    </testsuite></testsuites>
+"""
+
+
+def test_find_test_files():
+    with create_files(FILES) as r:
+        p = Package('mypkg')
+        names = [f[len(p.root) + 1:].replace('\\', '/') for f in find_test_files(p)]
+        assert sorted(names) == ['tests/js/widget.test.js', 'tests/sub/d_test.py',
+                                 'tests/test_a.py', 'tests/test_b.py', 'tests/test_c.py']
+
+
+def test_plan_shards():
+    with create_files(FILES) as r:
+        shards = plan_shards([Package('mypkg')], 2)
+        # a=8, d=6, b=2, and c, widget default to the median (6)
+        assert [s['estimate'] for s in shards] == [14.0, 14.0]
+        assert sorted(f for s in shards for f in s['files']) == [
+            'mypkg/tests/js/widget.test.js', 'mypkg/tests/sub/d_test.py',
+            'mypkg/tests/test_a.py', 'mypkg/tests/test_b.py', 'mypkg/tests/test_c.py',
+        ]
+        write_shards('shards.json', shards)
+        assert json.load(open('shards.json'))['shards'] == shards
@@ -0,0 +1,97 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from dkfileutils.path import Path
+from dkpkg.directory import Package
+from dkpkg.transaction import JOURNAL, lock_path, plan_missing, read_journal, write_journal
+from yamldirs import create_files
+
+
+def test_plan_missing_parents_first():
+    with create_files("mypkg: []") as r:
+        r = Path(r)
+        p = Package('mypkg', build=r / 'out/build')
+        plan = plan_missing(p)
+        assert plan.index(r / 'out') < plan.index(r / 'out/build')
+        assert plan.index(r / 'out/build') < plan.index(r / 'out/build/meta')
+        assert len(plan) == len(set(plan))
+
+
+def test_make_missing_atomic():
+    with create_files("mypkg: []") as r:
+        p = Package('mypkg')
+        created = p.make_missing(atomic=True, workers=4)
+        assert p.missing_dirs() == []
+        assert p.build_meta in created
+        journal = json.loads((p.build_meta / JOURNAL).read())
+        assert sorted(created) == journal['created']
+
+        # idempotent
+        assert p.make_missing(atomic=True) == []
+
+
+def test_make_missing_atomic_rollback():
+    files = """
+        mypkg:
+            - build: "a file, not a directory"
+    """
+    with create_files(files) as r:
+        p = Package('mypkg')
+        with pytest.raises(OSError):
+            p.make_missing(atomic=True)
+        assert not p.docs.exists()
+        assert not p.source.exists()
+        assert p.build.isfile()
+
+
+def test_make_missing_atomic_recovers_interrupted_run():
+    with create_files("mypkg: []") as r:
+        p = Package('mypkg')
+        # simulate a run killed after writing its intent log
+        plan = plan_missing(p)
+        for d in plan:
+            if not (p.build_meta == d or p.build_meta.startswith(d + os.sep)) and d != p.docs:
+                continue
+            os.mkdir(d)
+        write_journal(p, plan)
+        (p.docs / 'index.rst').write('keep')
+        assert not read_journal(p)['complete']
+
+        created = p.make_missing(atomic=True)
+        assert p.missing_dirs() == []
+        assert p.docs not in created          # not empty, so not rolled back
+        assert p.build_meta not in created    # holds the lock, so kept
+        assert not os.path.exists(lock_path(p))
+        journal = read_journal(p)
+        assert journal['complete']
+        assert journal['created'] == sorted(created)
+
+
+def test_make_missing_atomic_respects_running_run():
+    with create_files("mypkg: []") as r:
+        p = Package('mypkg')
+        # another (live) process is half way through
+        plan = plan_missing(p)
+        p.build_meta.makedirs()
+        p.docs.makedirs()
+        write_journal(p, plan)
+        with open(lock_path(p), 'w') as fp:
+            fp.write(str(os.getpid()))
+
+        with pytest.raises(FileExistsError):
+            p.make_missing(atomic=True)
+        assert p.docs.isdir()
+        assert not read_journal(p)['complete']
+
+        # the lock of a process that has died is replaced
+        proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+        proc.wait()
+        with open(lock_path(p), 'w') as fp:
+            fp.write(str(proc.pid))
+        p.make_missing(atomic=True)
+        assert p.missing_dirs() == []
+        assert read_journal(p)['complete']
+        assert not os.path.exists(lock_path(p))
@@ -0,0 +1,102 @@
+import json
+
+from dkfileutils.path import Path
+from dkpkg.directory import Package
+from dkpkg.fs import MemoryBackend
+from dkpkg.validate import as_records, validate, validate_many
+from yamldirs import create_files
+
+
+def codes(issues):
+    return sorted(issue.code for issue in issues)
+
+
+def test_valid_package():
+    files = """
+        mypkg:
+            - setup.py: |
+                from setuptools import setup
+                setup(name='mypkg', version='1.0')
+            - mypkg:
+                - __init__.py: ""
+    """
+    with create_files(files) as r:
+        assert validate(Package('mypkg')) == []
+
+
+def test_invalid_package():
+    files = """
+        mypkg:
+            - setup.py: |
+                import setuptools
+                setuptools.setup(name='otherpkg')
+            - mypkg:
+                - models.py: ""
+                - templates:
+                    - base.html: ""
+    """
+    with create_files(files) as r:
+        r = Path(r)
+        p = Package('mypkg',
+                    name='my_pkg',
+                    tests=r / 'mypkg/mypkg/tests',
+                    build=r / 'mypkg/mypkg/build',
+                    source=r / 'mypkg/mypkg',
+                    django_templates=r / 'mypkg/mypkg/templates')
+        issues = validate(p)
+        assert codes(issues) == [
+            'app-templates',
+            'build-in-source',
+            'role-overlap',
+            'setup-name', 'setup-name',
+            'source-init',
+        ]
+        assert [i.path for i in issues if i.code == 'build-in-source'] == [p.build]
+        assert codes(validate(p, rules=['source-init'])) == ['source-init']
+
+
+def test_setup_name_matches_name():
+    files = """
+        my-pkg:
+            - setup.py: |
+                from setuptools import setup
+                setup(name='my-pkg')
+            - my_pkg:
+                - __init__.py: ""
+                - templates:
+                    - my_pkg: []
+    """
+    with create_files(files) as r:
+        assert validate(Package('my-pkg', name='my_pkg')) == []
+        assert codes(validate(Package('my-pkg', package_name='my-pkg', name='other'))) == ['setup-name']
+
+
+def test_validate_many():
+    files = """
+        a:
+            - a: []
+        b: []
+    """
+    with create_files(files) as r:
+        results = validate_many([Package('a'), Package('b')], workers=2)
+        records = as_records(results)
+        assert [rec['code'] for rec in records] == ['source-init']
+        assert json.loads(json.dumps(records))[0]['root'] == Package('a').root
+
+
+def test_validate_memory_backend():
+    fs = MemoryBackend()
+    fs.write('/x/mypkg/setup.py', b"from setuptools import setup\nsetup(name='other')\n")
+    fs.write('/x/mypkg/mypkg/__init__.py', b'')
+    assert codes(validate(Package('/x/mypkg', fs=fs))) == ['setup-name', 'setup-name']
+
+
+def test_validate_extra_source_dirs():
+    fs = MemoryBackend()
+    fs.write('/x/mypkg/setup.py', b"from setuptools import setup\nsetup(name='mypkg')\n")
+    fs.write('/x/mypkg/mypkg/__init__.py', b'')
+    fs.makedirs('/x/mypkg/plugins')
+    p = Package('/x/mypkg', fs=fs, extra_dirs={'source': ['/x/mypkg/plugins']})
+    [issue] = validate(p)
+    assert issue.code == 'source-init'
+    assert issue.path == '/x/mypkg/plugins'
@@ -0,0 +1,86 @@
+import os
+
+from dkfileutils.path import Path
+from dkpkg.directory import Package
+from dkpkg.fs import MemoryBackend
+from yamldirs import create_files
+
+FILES = """
+    mypkg:
+        mypkg:
+            - __init__.py: ""
+            - models.py: ""
+            - static:
+                - app.js: "js"
+                - vendor:
+                    - lib.js: "lib"
+            - templates:
+                - index.html: "html"
+        js:
+            - main.js: "main"
+            - node_modules:
+                - dep.js: "dep"
+        build:
+            - out.txt: ""
+            - docs:
+                - index.html: "docs"
+"""
+
+
+def _relative(r, pairs):
+    return [(role, os.path.relpath(e.path, r).replace(os.sep, '/')) for role, e in pairs]
+
+
+def test_walk_tags_innermost_role():
+    with create_files(FILES) as r:
+        r = Path(r)
+        p = Package('mypkg')
+        found = _relative(r / 'mypkg', p.walk())
+        paths = [path for _, path in found]
+        assert len(paths) == len(set(paths))
+        tags = dict((path, role) for role, path in found)
+        assert tags['mypkg/__init__.py'] == 'source'
+        assert tags['mypkg/models.py'] == 'django_models'
+        assert tags['mypkg/static'] == 'django_static'
+        assert tags['mypkg/static/vendor/lib.js'] == 'django_static'
+        assert tags['mypkg/templates/index.html'] == 'django_templates'
+        assert tags['js/main.js'] == 'source_js'
+        assert tags['build/out.txt'] == 'build'
+        assert tags['build/docs/index.html'] == 'build_docs'
+
+
+def test_walk_roles_prune_types():
+    with create_files(FILES) as r:
+        r = Path(r)
+        p = Package('mypkg')
+        found = _relative(r / 'mypkg', p.walk(
+            ['source_js', 'django_static'],
+            prune=lambda role, e: e.name == 'node_modules',
+            types=['.js'],
+        ))
+        assert found == [
+            ('source_js', 'js/main.js'),
+            ('django_static', 'mypkg/static/app.js'),
+            ('django_static', 'mypkg/static/vendor/lib.js'),
+        ]
+
+        # nested roles that are not selected get the enclosing role
+        found = _relative(r / 'mypkg', p.walk(['build']))
+        assert ('build', 'build/docs/index.html') in found
+
+
+def test_walk_file_role():
+    with create_files(FILES) as r:
+        r = Path(r)
+        p = Package('mypkg')
+        found = _relative(r / 'mypkg', p.walk(['django_models']))
+        assert found == [('django_models', 'mypkg/models.py')]
+
+
+def test_walk_memory_backend():
+    fs = MemoryBackend()
+    fs.write('/src/mypkg/mypkg/static/a.css', b'a')
+    fs.write('/src/mypkg/less/b.less', b'b')
+    p = Package('/src/mypkg', fs=fs)
+    found = [(role, e.name) for role, e in p.walk(types=['.css', '.less'])]
+    assert found == [('source_less', 'b.less'), ('django_static', 'a.css')]